@@ -0,0 +1,541 @@
+"""Async serving mode.
+
+Timetable lookups behind /process-voice, admin class CRUD and admin token
+checks run on the event loop against one async Supabase client per worker,
+whose HTTP connections are pooled and kept alive. A slow Supabase response
+then parks a coroutine instead of a whole worker thread. With a local storage
+engine (STORAGE_ENGINE=sqlite or memory) the same handlers read and write it
+directly on the loop. Every other route is handed to the Flask app, which
+runs in a thread as before.
+
+    uvicorn asgi:app --workers 2
+    gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+"""
+import asyncio
+import inspect
+import json
+import re
+import time
+from urllib.parse import parse_qsl, unquote
+
+from werkzeug.http import parse_cookie, parse_etags
+
+from asgiref.wsgi import WsgiToAsgi
+from gotrue.errors import AuthApiError
+
+import app as flask_app
+from intent_router import FRIENDLY_INTENTS, normalize_utterance, resolve_day
+from metrics import finish_spans, record_spans, server_timing, span
+from pagination import PageError, next_page_headers, page_limit, page_request, page_rows
+from schedule_index import WeekIndex
+from storage import SupabaseStorage
+from supabase_client import SupabaseClient
+
+# Created on first use so the connection pool belongs to the serving event loop
+_supabase = None
+
+def get_supabase():
+    global _supabase
+    if _supabase is None:
+        # Timings land in the same histograms as the Flask side's calls
+        _supabase = SupabaseClient(
+            flask_app.SUPABASE_URL,
+            flask_app.SUPABASE_KEY,
+            timeout=flask_app.SUPABASE_TIMEOUT,
+            pool_size=flask_app.SUPABASE_POOL_SIZE,
+            latency=flask_app.supabase.latency,
+            asynchronous=True
+        )
+    return _supabase
+
+_storage = None
+
+def get_storage():
+    """The app's storage engine, with calls to Supabase made through the async client"""
+    global _storage
+    if _storage is None:
+        _storage = SupabaseStorage(get_supabase()) if flask_app.storage.remote else flask_app.storage
+    return _storage
+
+def reader_for(*tables):
+    """Async app.reader_for: the replica when it can answer for all the tables, else storage"""
+    return flask_app.replica_for(*tables) or get_storage()
+
+async def settled(result):
+    """A storage call's result, awaited when the engine answers asynchronously"""
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
+async def check_admin_role(token):
+    """Async check_admin_role: ask Supabase auth who the token belongs to and storage for their role"""
+    db = get_supabase()
+    try:
+        user = await db.auth.get_user(token)
+    except AuthApiError as e:
+        print(f"Rejected admin token: {e}")
+        return False
+    if not user or not user.user:
+        return False
+
+    return await settled(get_storage().user_role(user.user.id)) == 'admin'
+
+async def verify_admin_token(token):
+    """Async verify_admin_token, sharing the worker's verdict cache with the Flask routes"""
+    with span('verify_admin_token'):
+        key = flask_app.token_cache_key(token)
+        cache = flask_app.admin_token_cache
+        is_admin = cache.get(key)
+        if is_admin is not None:
+            return is_admin
+
+        generation = cache.generation
+        try:
+            is_admin = await check_admin_role(token)
+        except Exception as e:
+            print(f"Error verifying admin token: {e}")
+            return False
+        cache.set(key, is_admin, ttl=flask_app.admin_verdict_ttl(token, is_admin), generation=generation)
+        return is_admin
+
+async def query_schedule_table(table, day=None):
+    """Async query_schedule_table: read one schedule table and cache its rows"""
+    generation = flask_app.timetable_cache.generation
+    with span(f'fetch_timetable/{table}'):
+        # A local indexed read is quicker than handing it to a thread
+        store = reader_for(table)
+        if store.remote:
+            flask_app.count_timetable_round_trip()
+        rows = await settled(store.select(table, where={'day': day} if day else None))
+    flask_app.timetable_cache.set((table, day), rows, generation=generation)
+    return rows
+
+async def load_timetable(day=None):
+    """Async load_timetable: all schedule tables concurrently, returning (rows, failed tables)"""
+    rows = []
+    pending = {}
+    for table in flask_app.SCHEDULE_TABLES:
+        cached = flask_app.timetable_cache.get((table, day))
+        if cached is None:
+            pending[table] = asyncio.wait_for(query_schedule_table(table, day), flask_app.TIMETABLE_FETCH_TIMEOUT)
+        else:
+            rows.extend(cached)
+
+    failed = []
+    results = await asyncio.gather(*pending.values(), return_exceptions=True)
+    for table, result in zip(pending, results):
+        if isinstance(result, BaseException):
+            print(f"Error fetching {table}: {result!r}")
+            failed.append(table)
+        else:
+            rows.extend(result)
+
+    if len(failed) == len(flask_app.SCHEDULE_TABLES):
+        raise RuntimeError(f"No schedule tables could be read: {', '.join(failed)}")
+    rows = [dict(row) for row in rows]
+    rows.sort(key=lambda row: row['period'])
+    return rows, failed
+
+async def get_week_index():
+    """Async get_week_index, filling the cache the Flask code reads"""
+    cache = flask_app.timetable_cache
+    index = cache.get('week_index')
+    if index is None:
+        generation = cache.generation
+        rows, failed = await load_timetable()
+        index = WeekIndex(rows)
+        if not failed:
+            cache.set('week_index', index, generation=generation)
+    return index
+
+async def get_conflict_index():
+    """Async get_conflict_index, reading both bookings tables concurrently"""
+    cache = flask_app.timetable_cache
+    index = cache.get('conflict_index')
+    if index is None:
+        generation = cache.generation
+        store = reader_for('course_schedules', 'schedules')
+        course_rows, class_rows = await asyncio.gather(
+            settled(store.select('course_schedules', columns=flask_app.COURSE_SLOT_COLUMNS)),
+            settled(store.select('schedules', columns=flask_app.CLASS_SLOT_COLUMNS))
+        )
+        index = flask_app.build_conflict_index(course_rows, class_rows)
+        cache.set('conflict_index', index, generation=generation)
+    return index
+
+async def read_page(request, table, filters=None):
+    """Async read_page: one keyset page of a table for the request's query args"""
+    keys = flask_app.LIST_KEYS[table]
+    page = page_request(request.args, keys, flask_app.LIST_COLUMNS[table],
+                        flask_app.LIST_PAGE_SIZE, flask_app.LIST_MAX_PAGE_SIZE)
+    rows = await settled(reader_for(table).select(table, where=filters, order=keys, after=page.after,
+                                                  columns=flask_app.page_columns(page, keys), limit=page.limit + 1))
+    return page_rows(rows, page, keys)
+
+async def prefetch_timetable(text):
+    """Load whatever timetable rows answering the utterance will need into the cache"""
+    intent = flask_app.parse_utterance(text)
+    if intent.name in FRIENDLY_INTENTS or intent.name == 'unknown':
+        return
+    day, _ = resolve_day(intent.day)
+    loads = [get_week_index()]
+    if day:
+        loads.append(load_timetable(day))
+    # Failures are left for the schedule handler to report as usual
+    await asyncio.gather(*loads, return_exceptions=True)
+
+def in_session(context, handler, *args):
+    """Call a Flask handler that reads the conversation context, outside any Flask request"""
+    with flask_app.app.app_context():
+        # get_context finds the session's context here instead of reading a request
+        flask_app.g.conversation_context = context
+        return handler(*args)
+
+def answer_schedule_query(text, context):
+    return in_session(context, flask_app.handle_schedule_query, text)
+
+async def generate_ai_response(user_input, context, use_cache=True):
+    """Async generate_ai_response; the model reply is awaited rather than blocked on"""
+    await prefetch_timetable(user_input)
+    # Rows are cached now, so the handler is CPU work; a thread keeps any retry off the loop
+    schedule_response = await asyncio.to_thread(answer_schedule_query, user_input, context)
+    if schedule_response:
+        return schedule_response
+
+    cache_key = (normalize_utterance(user_input),) + flask_app.RESPONSE_CACHE_PARAMS
+    if use_cache:
+        cached = flask_app.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # While the model loads this is the help text, which reads the context too
+    unavailable = in_session(context, flask_app.model_unavailable_reply)
+    if unavailable:
+        return unavailable
+
+    try:
+        future = flask_app.chat_generator.submit(flask_app.chat_prompt(user_input))
+        # Cancelling the wrapper on timeout also drops the queued generation
+        with span('chat_generator.generate'):
+            response = await asyncio.wait_for(asyncio.wrap_future(future), flask_app.GENERATION_TIMEOUT)
+        response = (response + flask_app.reply_emoji(response)).strip()
+        if use_cache:
+            flask_app.response_cache.set(cache_key, response)
+        return response
+    except Exception as e:
+        print(f"Error generating response: {e}")
+        return flask_app.GENERATION_ERROR_REPLY
+
+
+class Request:
+    """The parts of an ASGI HTTP request the async routes read"""
+
+    __slots__ = ('scheme', 'method', 'path', 'query', 'headers', 'params', 'body')
+
+    def __init__(self, scope, params, body):
+        self.scheme = scope.get('scheme', 'http')
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query = scope.get('query_string', b'').decode('latin-1')
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.params = params
+        self.body = body
+
+    def get_json(self):
+        return json.loads(self.body) if self.body else None
+
+    @property
+    def args(self):
+        """Query arguments, first value per name as with Flask's request.args.get"""
+        args = {}
+        for name, value in parse_qsl(self.query):
+            args.setdefault(name, value)
+        return args
+
+    @property
+    def cookies(self):
+        return parse_cookie(self.headers.get('cookie', ''))
+
+    @property
+    def base_url(self):
+        return f"{self.scheme}://{self.headers.get('host', 'localhost')}{self.path}"
+
+    @property
+    def full_path(self):
+        """Path and query string, spelled as Flask's request.full_path"""
+        return f"{self.path}?{self.query}"
+
+    def bearer_token(self):
+        auth_header = self.headers.get('authorization')
+        if not auth_header or not auth_header.startswith('Bearer '):
+            return None
+        return auth_header.split(' ')[1]
+
+
+def requires_admin(handler):
+    """Async requires_admin: same responses as the Flask decorator"""
+    async def decorated(request):
+        try:
+            token = request.bearer_token()
+            if not token:
+                return {'error': 'No token provided'}, 401
+            if not await verify_admin_token(token):
+                return {'error': 'Unauthorized. Admin access required.'}, 401
+        except Exception as e:
+            print(f"Error in admin verification: {e}")
+            return {'error': 'Authentication failed'}, 401
+        return await handler(request)
+    return decorated
+
+
+def conditional_get(*tables):
+    """Async conditional_get: If-None-Match answered from the table versions, before any read"""
+    def decorator(handler):
+        async def decorated(request):
+            etag = flask_app.table_etag(tables, request.full_path)
+            headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+            not_modified = parse_etags(request.headers.get('if-none-match')).contains_weak(etag)
+            flask_app.count_conditional_get(not_modified)
+            if not_modified:
+                return None, 304, headers
+            payload, status, *extra = await handler(request)
+            if status != 200:
+                return payload, status
+            headers.update(*extra)
+            return payload, status, headers
+        return decorated
+    return decorator
+
+
+async def verify_admin(request):
+    token = request.bearer_token()
+    if not token:
+        return {'is_admin': False, 'error': 'No token provided'}, 401
+    is_admin = await verify_admin_token(token)
+    return {
+        'is_admin': is_admin,
+        'message': 'Admin verification successful' if is_admin else 'User is not an admin'
+    }, 200
+
+@requires_admin
+@conditional_get('schedules')
+async def get_all_classes(request):
+    try:
+        classes, next_cursor = await read_page(request, 'schedules')
+    except PageError as e:
+        return {'error': str(e)}, 400
+    return {'classes': classes, 'next_cursor': next_cursor}, 200, \
+        next_page_headers(request.base_url, request.args, next_cursor,
+                          page_limit(request.args, flask_app.LIST_PAGE_SIZE, flask_app.LIST_MAX_PAGE_SIZE))
+
+@requires_admin
+@conditional_get('schedules')
+async def get_classes_by_day(request):
+    classes = await settled(reader_for('schedules').select(
+        'schedules', where={'day': request.params['day'].upper()}, order=('period',)))
+    return {'classes': classes}, 200
+
+@requires_admin
+async def add_class(request):
+    data = request.get_json()
+    if not all(field in data for field in flask_app.CLASS_FIELDS):
+        return {'error': 'Missing required fields'}, 400
+    error = flask_app.time_error(data)
+    if error:
+        return {'error': error}, 400
+
+    # The slot read and the bookings index load don't depend on each other
+    existing, conflict_index = await asyncio.gather(
+        settled(get_storage().select('schedules', where={'day': data['day'], 'period': data['period']},
+                                     columns=('id',))),
+        get_conflict_index()
+    )
+    if existing:
+        return {'error': 'A class already exists in this time slot'}, 409
+    conflicts = conflict_index.check(flask_app.slot_from_row(data, 'schedules'))
+    if conflicts:
+        return flask_app.conflict_payload(conflicts), 409
+
+    created = await settled(get_storage().insert('schedules', data))
+    flask_app.table_written('schedules')
+    return {
+        'message': 'Class added successfully',
+        'class': created[0] if created else data
+    }, 201
+
+@requires_admin
+async def update_class(request):
+    class_id = int(request.params['class_id'])
+    data = request.get_json()
+    if not all(field in data for field in flask_app.CLASS_FIELDS):
+        return {'error': 'Missing required fields'}, 400
+    error = flask_app.time_error(data)
+    if error:
+        return {'error': error}, 400
+
+    existing, conflict_index = await asyncio.gather(
+        settled(get_storage().select('schedules', where={'id': class_id}, columns=('id',))),
+        get_conflict_index()
+    )
+    if not existing:
+        return {'error': 'Class not found'}, 404
+    conflicts = conflict_index.check(flask_app.slot_from_row(data, 'schedules'), ('schedules', class_id))
+    if conflicts:
+        return flask_app.conflict_payload(conflicts), 409
+
+    updated = await settled(get_storage().update('schedules', {'id': class_id}, data))
+    flask_app.table_written('schedules')
+    return {
+        'message': 'Class updated successfully',
+        'class': updated[0] if updated else data
+    }, 200
+
+@requires_admin
+async def delete_class(request):
+    class_id = int(request.params['class_id'])
+    existing = await settled(get_storage().select('schedules', where={'id': class_id}, columns=('id',)))
+    if not existing:
+        return {'error': 'Class not found'}, 404
+
+    await settled(get_storage().delete('schedules', {'id': class_id}))
+    flask_app.table_written('schedules')
+    return {'message': 'Class deleted successfully'}, 200
+
+async def process_voice(request):
+    data = request.get_json()
+    if not data:
+        return {'reply': "No data received"}, 400
+    user_input = data.get('text', '')
+    if not user_input:
+        return {'reply': "Please say something!"}, 400
+
+    print(f"Processing voice input: {user_input}")
+    session_id = flask_app.requested_session_id(request.headers, request.cookies)
+    started = session_id is None
+    session_id = session_id or flask_app.new_session_id()
+    context = flask_app.sessions.load(session_id)
+    bypass = request.headers.get(flask_app.RESPONSE_CACHE_BYPASS_HEADER.lower(), '').lower() in ('1', 'true', 'yes')
+    response = await generate_ai_response(user_input, context, use_cache=not bypass)
+    print(f"Generated response: {response}")
+    return {'reply': response}, 200, flask_app.session_headers(session_id, started, request.scheme == 'https')
+
+
+# (method, path pattern, handler, payload returned with a 500 on unexpected errors)
+ROUTES = [
+    ('GET', r'/admin/verify', verify_admin, {'is_admin': False, 'error': 'Failed to verify admin status'}),
+    ('GET', r'/admin/classes', get_all_classes, {'error': 'Failed to fetch classes'}),
+    ('POST', r'/admin/classes', add_class, {'error': 'Failed to add class'}),
+    ('PUT', r'/admin/classes/(?P<class_id>\d+)', update_class, {'error': 'Failed to update class'}),
+    ('DELETE', r'/admin/classes/(?P<class_id>\d+)', delete_class, {'error': 'Failed to delete class'}),
+    ('GET', r'/admin/classes/day/(?P<day>[^/]+)', get_classes_by_day, {'error': 'Failed to fetch classes for {day}'}),
+    ('POST', r'/process-voice', process_voice, {'reply': "Sorry, an error occurred while processing your request."}),
+]
+
+
+def rule_label(pattern):
+    """Flask's spelling of a route pattern, so both serving modes share metric labels"""
+    def placeholder(match):
+        converter = 'int:' if match.group(2) == r'\d+' else ''
+        return f"<{converter}{match.group(1)}>"
+    return re.sub(r'\(\?P<(\w+)>([^)]*)\)', placeholder, pattern)
+
+
+COMPILED_ROUTES = [(method, re.compile(pattern + r'/?'), handler, error, rule_label(pattern))
+                   for method, pattern, handler, error in ROUTES]
+
+
+def match_route(scope):
+    """Return (handler, params, error payload, rule) for an async route, or None to use Flask"""
+    headers = dict(scope['headers'])
+    # Streamed replies stay on the Flask generator path
+    if scope['path'] == '/process-voice' and b'text/event-stream' in headers.get(b'accept', b''):
+        return None
+    for method, pattern, handler, error, rule in COMPILED_ROUTES:
+        if scope['method'] != method:
+            continue
+        match = pattern.fullmatch(scope['path'])
+        if match:
+            params = {name: unquote(value) for name, value in match.groupdict().items()}
+            return handler, params, error, rule
+    return None
+
+
+class AsyncApp:
+    """ASGI app serving the async routes natively and everything else through Flask"""
+
+    def __init__(self, flask):
+        self.wsgi = WsgiToAsgi(flask)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        route = match_route(scope) if scope['type'] == 'http' else None
+        if route is None:
+            return await self.wsgi(scope, receive, send)
+
+        handler, params, error, rule = route
+        started = time.perf_counter()
+        spans_token = record_spans()
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        request = Request(scope, params, body)
+        headers = {}
+        try:
+            payload, status, *extra = await handler(request)
+            if extra:
+                headers = dict(extra[0])
+        except Exception as e:
+            print(f"Error handling {request.method} {request.path}: {e}")
+            payload = {key: value.format(**params) if isinstance(value, str) else value
+                       for key, value in error.items()}
+            status = 500
+        finally:
+            spans = finish_spans(spans_token)
+        # Same series and header as Flask's after_request
+        elapsed = time.perf_counter() - started
+        flask_app.route_latency.observe((rule, request.method), elapsed, error=status >= 500)
+        timings = [server_timing(spans), f"total;dur={elapsed * 1000:.2f}"]
+        headers['Server-Timing'] = ', '.join(timing for timing in timings if timing)
+        await self.send_json(send, request, payload, status, headers)
+
+    @staticmethod
+    async def send_json(send, request, payload, status, extra_headers=None):
+        """Send payload as JSON; a None payload sends an empty body, as for 304"""
+        if payload is None:
+            body = b''
+            headers = [(b'content-length', b'0')]
+        else:
+            body = json.dumps(payload).encode()
+            headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+        headers += [(name.lower().encode(), value.encode('latin-1')) for name, value in (extra_headers or {}).items()]
+        origin = request.headers.get('origin')
+        if origin:
+            # Match the CORS(app, ...) setup on the Flask side
+            headers += [
+                (b'access-control-allow-origin', origin.encode('latin-1')),
+                (b'access-control-allow-credentials', b'true'),
+                (b'access-control-expose-headers', b'ETag, Link, X-Next-Cursor, X-Page-Limit, X-Session-Id'),
+                (b'vary', b'Origin')
+            ]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    @staticmethod
+    async def lifespan(receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if _supabase is not None:
+                    await _supabase.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = AsyncApp(flask_app.app)
@@ -0,0 +1,83 @@
+"""Throughput of chat generation with and without micro-batching.
+
+Simulates 1, 8 and 32 concurrent users, each sending a few prompts back to
+back, first through a BatchScheduler limited to batches of one (the old
+one-generate-per-request behaviour) and then with batching enabled.
+
+Downloads the model on first run.  Run from the repository root:
+    python benchmarks/bench_inference_batching.py [--batch-size 8] [--wait-ms 10]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference import BatchScheduler, ModelLoader
+
+PROMPTS = [
+    "How do you stay focused during long lectures?",
+    "Any tips for preparing for exams?",
+    "What's a good way to take notes?",
+    "I'm tired today, any advice?",
+    "Tell me something fun about computers.",
+    "How can I get better at programming?",
+    "What should I do between classes?",
+    "How do I make friends in college?"
+]
+GENERATE_KWARGS = {'temperature': 0.7, 'num_return_sequences': 1, 'top_k': 50, 'top_p': 0.9}
+
+
+def run(scheduler, users, requests_per_user):
+    """Return (requests/s, p95 latency in seconds) for a burst of concurrent users"""
+    latencies = []
+
+    def user(n):
+        for i in range(requests_per_user):
+            started = time.perf_counter()
+            scheduler.generate(PROMPTS[(n + i) % len(PROMPTS)])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, range(users)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return len(latencies) / elapsed, latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=os.getenv('MODEL_NAME', 'microsoft/DialoGPT-small'))
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--wait-ms', type=float, default=10)
+    parser.add_argument('--requests', type=int, default=4, help='requests per user')
+    args = parser.parse_args()
+
+    loader = ModelLoader(args.model)
+    loader.start(background=False)
+    if loader.state != 'ready':
+        print(f"Model failed to load: {loader.error}")
+        return 1
+
+    unbatched = BatchScheduler(loader, max_batch_size=1, max_wait_ms=0, generate_kwargs=GENERATE_KWARGS)
+    batched = BatchScheduler(loader, max_batch_size=args.batch_size, max_wait_ms=args.wait_ms,
+                             generate_kwargs=GENERATE_KWARGS)
+    # Warm up both paths so the first timed batch does not pay for lazy init
+    unbatched.generate(PROMPTS[0])
+    batched.generate(PROMPTS[0])
+
+    print(f"{'users':>5}  {'unbatched req/s':>15}  {'p95 s':>7}  {'batched req/s':>13}  {'p95 s':>7}  speedup")
+    for users in (1, 8, 32):
+        single_rate, single_p95 = run(unbatched, users, args.requests)
+        batch_rate, batch_p95 = run(batched, users, args.requests)
+        print(f"{users:>5}  {single_rate:>15.2f}  {single_p95:>7.2f}  {batch_rate:>13.2f}  {batch_p95:>7.2f}  "
+              f"x{batch_rate / single_rate:.1f}")
+    print(f"batched scheduler: {batched.stats()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
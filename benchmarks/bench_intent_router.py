@@ -0,0 +1,111 @@
+"""Intent router throughput benchmark.
+
+Compares parse_intent throughput over intent_corpus.json with the
+substring cascade that handle_schedule_query used to run, with and
+without that cascade's debug prints. The router is roughly on par with
+the bare cascade; what it saves as deployed is the prints. That every
+corpus utterance still parses as recorded is checked by
+tests/test_intent_router.py.
+
+Run from the repository root:  python benchmarks/bench_intent_router.py
+"""
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_router import parse_intent
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent_corpus.json')
+DEVNULL = open(os.devnull, 'w')
+
+
+def legacy_classify(text, log=None):
+    """The old phrase-list cascade; pass log to also pay for its debug prints"""
+    if log:
+        print(f"Handling schedule query: {text}", file=log)
+    text = text.lower()
+    if log:
+        print(f"Lowercased text: {text}", file=log)
+    if len(text.split()) <= 3:
+        if any(word in text for word in ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening']):
+            return 'greeting'
+        if 'how are you' in text:
+            return 'how_are_you'
+        if any(word in text for word in ['thank', 'thanks', 'thx']):
+            return 'thanks'
+        if any(word in text for word in ['bye', 'goodbye', 'see you', 'cya']):
+            return 'goodbye'
+    now = datetime.now()
+    if log:
+        print(f"Current day: {now.strftime('%A').lower()}", file=log)
+    day = None
+    for relative in ['tomorrow', 'today', 'yesterday']:
+        if relative in text:
+            day = relative
+            break
+    else:
+        for day_name in ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']:
+            if day_name in text:
+                day = day_name
+                break
+    ordinals = ['first', 'second', 'third', 'fourth', 'fifth', '1st', '2nd', '3rd', '4th', '5th', 'last']
+    has_ordinal = any(ordinal in text for ordinal in ordinals)
+    has_numeric = bool(re.search(r'(\d+)(?:st|nd|rd|th)?\s*(?:class|period)', text))
+    if log:
+        print(f"Detected day: {day}", file=log)
+        print(f"Has ordinal: {has_ordinal}, Has numeric: {has_numeric}", file=log)
+        print(f"Found ordinals: {[ordinal for ordinal in ordinals if ordinal in text]}", file=log)
+    if has_ordinal or has_numeric:
+        for ordinal in ordinals:
+            if ordinal in text:
+                return 'nth_class'
+        re.search(r'(\d+)(?:st|nd|rd|th)?\s*(?:class|period)', text)
+        return 'nth_class'
+    if day:
+        any(phrase in text for phrase in ['schedule', 'classes', 'periods', 'lectures'])
+        return 'day_schedule'
+    if any(phrase in text for phrase in [
+            'after that', 'following that', 'after this', 'what then', 'and then',
+            'what about after', 'what follows', 'what comes after', 'what is after',
+            'what class is after', 'what comes next', 'what is next after that']):
+        return 'follow_up'
+    if any(phrase in text for phrase in ['next class', 'next period', 'upcoming class', 'following class']):
+        return 'next_class'
+    if any(phrase in text for phrase in ['current class', 'right now', 'this class', 'present class']):
+        return 'current_class'
+    if 'week' in text or 'all' in text:
+        return 'week_schedule'
+    return 'unknown'
+
+
+def throughput(classify, utterances, rounds=2000):
+    """Utterances classified per second over repeated passes of the corpus"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in utterances:
+            classify(text)
+    elapsed = time.perf_counter() - start
+    return rounds * len(utterances) / elapsed
+
+
+def main():
+    with open(CORPUS) as f:
+        corpus = json.load(f)
+
+    utterances = [case['text'] for case in corpus]
+    legacy = throughput(legacy_classify, utterances)
+    logged = throughput(lambda text: legacy_classify(text, DEVNULL), utterances)
+    router = throughput(parse_intent, utterances)
+    print(f"legacy cascade          : {legacy:10.0f} utterances/s")
+    print(f"legacy cascade + prints : {logged:10.0f} utterances/s")
+    print(f"intent router           : {router:10.0f} utterances/s  "
+          f"(x{router / legacy:.1f} cascade, x{router / logged:.1f} cascade + prints)")
+
+
+if __name__ == '__main__':
+    main()
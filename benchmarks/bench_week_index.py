@@ -0,0 +1,92 @@
+"""Micro-benchmark: linear timetable scans versus WeekIndex bisect lookups.
+
+Run from the repository root:  python benchmarks/bench_week_index.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import TIMETABLE_ENTRIES
+from schedule_index import WEEKDAYS, WeekIndex, clock_minutes
+
+FIELDS = ('day', 'period', 'start_time', 'end_time', 'subject', 'room')
+
+
+def fixture_rows(copies=1):
+    """Timetable fixture rows, optionally repeated to simulate a larger catalogue"""
+    rows = []
+    for copy in range(copies):
+        for entry in TIMETABLE_ENTRIES:
+            row = dict(zip(FIELDS, entry))
+            row['period'] += copy * 10
+            rows.append(row)
+    return rows
+
+
+def linear_current(by_day, day, minutes):
+    """The scan get_current_class used to run on every call"""
+    for class_ in by_day.get(day, []):
+        if clock_minutes(class_['start_time']) <= minutes <= clock_minutes(class_['end_time']):
+            return class_
+    return None
+
+
+def linear_next(by_day, day, minutes):
+    """The scan get_next_class used to run, including the later-day rollover"""
+    for class_ in by_day.get(day, []):
+        if clock_minutes(class_['start_time']) > minutes:
+            return day, class_
+    start = WEEKDAYS.index(day) + 1 if day in WEEKDAYS else 0
+    for next_day in WEEKDAYS[start:]:
+        if by_day.get(next_day):
+            return next_day, by_day[next_day][0]
+    return None, None
+
+
+def linear_after(by_day, day, period):
+    """The scan get_class_after used to run for the same day"""
+    found = False
+    for class_ in by_day.get(day, []):
+        if found:
+            return class_
+        if class_['period'] == period:
+            found = True
+    return None
+
+
+def main():
+    number = 20000
+    for copies in (1, 4, 16):
+        rows = fixture_rows(copies)
+        by_day = {}
+        for row in sorted(rows, key=lambda r: r['period']):
+            by_day.setdefault(row['day'], []).append(row)
+        index = WeekIndex(rows)
+        last_thu = by_day['THU'][-2]['period']
+
+        cases = {
+            'current (MON 10:00)': (
+                lambda: linear_current(by_day, 'MON', 600),
+                lambda: index.current('MON', 600)),
+            'next (MON 16:55, rolls over)': (
+                lambda: linear_next(by_day, 'MON', 1015),
+                lambda: index.next_class('MON', 1015)),
+            'after period (late THU)': (
+                lambda: linear_after(by_day, 'THU', last_thu),
+                lambda: index.after_period('THU', last_thu)),
+        }
+        print(f"\n{len(rows)} rows")
+        for name, (linear, indexed) in cases.items():
+            linear_us = timeit.timeit(linear, number=number) / number * 1e6
+            indexed_us = timeit.timeit(indexed, number=number) / number * 1e6
+            print(f"  {name:30s} linear {linear_us:7.2f} us  index {indexed_us:7.2f} us  "
+                  f"x{linear_us / indexed_us:5.1f}")
+
+    build_us = timeit.timeit(lambda: WeekIndex(fixture_rows()), number=2000) / 2000 * 1e6
+    print(f"\nIndex build for {len(TIMETABLE_ENTRIES)} rows: {build_us:.1f} us (once per snapshot)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Concurrent request capacity of one worker: sync Flask versus the ASGI mode.
+
+Starts the local Supabase stand-in (PostgREST and GoTrue over HTTP/1.1
+keep-alive, answering from the timetable fixture after a fixed latency),
+points the app at it, and drives GET /admin/classes/day/<day> from 1 to 64
+concurrent clients. The Flask worker gets --threads request threads, like a
+gunicorn (g)thread worker; the ASGI worker gets a single event loop.
+
+Run from the repository root:
+    python benchmarks/load_async_serving.py [--latency-ms 50] [--threads 1] [--requests 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+from supabase_stand_in import ADMIN_TOKEN, DAYS, StandInSupabase
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_flask(flask_app, users, requests_per_user, threads):
+    """Closed-loop clients against a Flask worker limited to `threads` concurrent requests"""
+    slots = threading.Semaphore(threads)
+    latencies = []
+    headers = {'Authorization': f'Bearer {ADMIN_TOKEN}'}
+
+    def client(n):
+        test_client = flask_app.test_client()
+        for i in range(requests_per_user):
+            started = time.perf_counter()
+            with slots:
+                response = test_client.get(f'/admin/classes/day/{DAYS[(n + i) % len(DAYS)]}', headers=headers)
+            assert response.status_code == 200, response.get_json()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client, args=(n,)) for n in range(users)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return len(latencies) / (time.perf_counter() - started), percentile(latencies, 0.95)
+
+
+async def run_asgi(asgi_app, users, requests_per_user):
+    """Closed-loop clients against the ASGI app on this event loop"""
+    import httpx
+    latencies = []
+    headers = {'Authorization': f'Bearer {ADMIN_TOKEN}'}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url='http://worker') as http:
+        async def client(n):
+            for i in range(requests_per_user):
+                started = time.perf_counter()
+                response = await http.get(f'/admin/classes/day/{DAYS[(n + i) % len(DAYS)]}', headers=headers)
+                assert response.status_code == 200, response.json()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(n) for n in range(users)))
+    return len(latencies) / (time.perf_counter() - started), percentile(latencies, 0.95)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency-ms', type=float, default=50, help='stand-in Supabase latency per request')
+    parser.add_argument('--threads', type=int, default=1, help='request threads in the Flask worker')
+    parser.add_argument('--requests', type=int, default=20, help='requests per client')
+    args = parser.parse_args()
+
+    stand_in = StandInSupabase(args.latency_ms)
+    os.environ['SUPABASE_URL'] = stand_in.start()
+    os.environ.setdefault('MODEL_LOADING', 'lazy')
+    import asgi
+    import app as flask_app
+
+    print(f"Supabase stand-in at {stand_in.url}, {args.latency_ms:.0f}ms per request; "
+          f"Flask worker with {args.threads} thread(s) vs one ASGI event loop")
+    print(f"{'clients':>7}  {'flask req/s':>11}  {'p95 ms':>7}  {'asgi req/s':>10}  {'p95 ms':>7}  speedup")
+    loop = asyncio.new_event_loop()
+    try:
+        for users in (1, 8, 32, 64):
+            sync_rate, sync_p95 = run_flask(flask_app.app, users, args.requests, args.threads)
+            async_rate, async_p95 = loop.run_until_complete(run_asgi(asgi.app, users, args.requests))
+            print(f"{users:>7}  {sync_rate:>11.1f}  {sync_p95 * 1000:>7.0f}  {async_rate:>10.1f}  "
+                  f"{async_p95 * 1000:>7.0f}  x{async_rate / sync_rate:.1f}")
+    finally:
+        loop.run_until_complete(asgi.get_supabase().close())
+        loop.close()
+    print(f"stand-in served {stand_in.requests} requests")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
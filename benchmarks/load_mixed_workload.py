@@ -0,0 +1,349 @@
+"""Mixed-workload load test, reporting throughput and latency per route as JSON.
+
+Boots the app in-process against the local Supabase stand-in (fixtures from
+database.py, --latency-ms per Supabase request) with the chat model replaced
+by a stub that answers after --model-ms per batch, behind the real batch
+scheduler. --clients closed-loop clients then replay a weighted mix of chat
+utterances, admin class CRUD and course reads. The result is printed (or
+written to --output) as JSON, so runs on two commits can be compared:
+
+    python benchmarks/load_mixed_workload.py --output before.json
+    python benchmarks/load_mixed_workload.py --clients 32 --latency-ms 40 --mode asgi
+
+--env NAME=VALUE sets app configuration before it is imported, e.g.
+--env REPLICA_PATH=/tmp/bench-replica.db to serve reads from the replica, or
+--env STORAGE_ENGINE=memory to keep the tables in the worker; local engines
+are seeded with the stand-in's fixtures (sqlite also wants STORAGE_PATH).
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from supabase_stand_in import ADMIN_TOKEN, DAYS, StandInSupabase, fixture_tables
+
+from inference import BatchScheduler
+
+SCHEDULE_UTTERANCES = [
+    "what classes do I have on monday",
+    "what's my schedule for tuesday",
+    "what is my next class",
+    "where is my cloud class",
+    "what is my first class on wednesday",
+    "when is distributed systems on thursday",
+    "how many wireless classes do I have this week",
+    "what's on friday",
+    "hi there",
+    "thank you"
+]
+CHAT_UTTERANCES = [
+    "tell me something fun about computers",
+    "how do I stay focused during long lectures",
+    "any tips for exams",
+    "I'm tired today",
+    "what should I do between classes",
+    "how can I get better at programming"
+]
+STUB_REPLY = "That sounds like a great question, let's think about it together."
+COURSE_CODES = [course['code'] for course in fixture_tables()['courses']]
+
+# Share of requests per operation; CRUD keeps the classes it creates balanced
+WORKLOAD = {
+    'chat_schedule': 30,
+    'chat_model': 12,
+    'list_classes': 10,
+    'classes_by_day': 10,
+    'add_class': 6,
+    'update_class': 5,
+    'delete_class': 5,
+    'list_courses': 10,
+    'course_schedule': 10,
+    'verify_admin': 2
+}
+
+
+class StubModel:
+    """Stands in for ModelLoader: ready at once, no weights"""
+
+    state = 'ready'
+
+    def get(self, wait=0):
+        return 'stub-model', 'stub-tokenizer'
+
+    def start(self, background=True):
+        pass
+
+    def status(self):
+        return {'state': self.state, 'model': 'stub'}
+
+
+class StubScheduler(BatchScheduler):
+    """The real batching scheduler, with each batch's generate replaced by a fixed sleep"""
+
+    def __init__(self, generate_ms, **kwargs):
+        super().__init__(StubModel(), **kwargs)
+        self.generate_seconds = generate_ms / 1000
+
+    def _generate_batch(self, prompts):
+        time.sleep(self.generate_seconds)
+        return [STUB_REPLY] * len(prompts)
+
+    def stream(self, prompt, timeout=None):
+        words = STUB_REPLY.split(' ')
+        for word in words:
+            time.sleep(self.generate_seconds / len(words))
+            yield word + ' '
+
+
+class Workload:
+    """One client's request stream: picks the next request and follows up on responses"""
+
+    def __init__(self, client_id, seed):
+        self.client_id = client_id
+        self.random = random.Random(seed * 100003 + client_id)
+        self.operations = list(WORKLOAD)
+        self.weights = list(WORKLOAD.values())
+        self.added = 0
+        # Classes this client created and has not deleted, by id
+        self.classes = {}
+
+    def next_request(self):
+        """(route label, method, path, JSON body, needs admin token)"""
+        return getattr(self, self.random.choices(self.operations, self.weights)[0])()
+
+    def record(self, route, status, payload):
+        if route == 'POST /admin/classes' and status == 201:
+            row = payload['class']
+            self.classes[row['id']] = {field: row[field] for field in
+                                       ('day', 'period', 'subject', 'start_time', 'end_time', 'room')}
+
+    def chat_schedule(self):
+        return 'POST /process-voice (schedule)', 'POST', '/process-voice', \
+            {'text': self.random.choice(SCHEDULE_UTTERANCES)}, False
+
+    def chat_model(self):
+        return 'POST /process-voice (model)', 'POST', '/process-voice', \
+            {'text': self.random.choice(CHAT_UTTERANCES)}, False
+
+    def list_classes(self):
+        return 'GET /admin/classes', 'GET', '/admin/classes', None, True
+
+    def classes_by_day(self):
+        return 'GET /admin/classes/day/<day>', 'GET', f'/admin/classes/day/{self.random.choice(DAYS)}', None, True
+
+    def add_class(self):
+        # Saturday slots in rooms of their own never conflict with the timetable or each other
+        self.added += 1
+        body = {
+            'day': 'SAT',
+            'period': self.client_id * 100000 + self.added,
+            'subject': 'LOAD TEST',
+            'start_time': '9:00',
+            'end_time': '9:50',
+            'room': f'BENCH-{self.client_id}-{self.added}'
+        }
+        return 'POST /admin/classes', 'POST', '/admin/classes', body, True
+
+    def update_class(self):
+        if not self.classes:
+            return self.add_class()
+        class_id = self.random.choice(list(self.classes))
+        body = dict(self.classes[class_id], subject='LOAD TEST (moved)')
+        return 'PUT /admin/classes/<id>', 'PUT', f'/admin/classes/{class_id}', body, True
+
+    def delete_class(self):
+        if not self.classes:
+            return self.add_class()
+        class_id = self.random.choice(list(self.classes))
+        del self.classes[class_id]
+        return 'DELETE /admin/classes/<id>', 'DELETE', f'/admin/classes/{class_id}', None, True
+
+    def list_courses(self):
+        return 'GET /api/courses', 'GET', '/api/courses', None, False
+
+    def course_schedule(self):
+        return 'GET /api/courses/<code>/schedule', 'GET', \
+            f'/api/courses/{self.random.choice(COURSE_CODES)}/schedule', None, False
+
+    def verify_admin(self):
+        return 'GET /admin/verify', 'GET', '/admin/verify', None, True
+
+
+def percentile(values, fraction):
+    """Linearly interpolated percentile of a non-empty list"""
+    values = sorted(values)
+    rank = (len(values) - 1) * fraction
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def summarize(samples, duration):
+    """Per-route and overall throughput, error count and latency percentiles"""
+    def stats(entries):
+        latencies = [latency for _, latency in entries]
+        statuses = {}
+        for status, _ in entries:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            'requests': len(entries),
+            'throughput_rps': round(len(entries) / duration, 2),
+            'errors': sum(1 for status, _ in entries if status >= 400),
+            'statuses': statuses,
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3)
+        }
+
+    routes = {}
+    for route, status, latency in samples:
+        routes.setdefault(route, []).append((status, latency))
+    return {
+        'total': stats([(status, latency) for _, status, latency in samples]),
+        'routes': {route: stats(entries) for route, entries in sorted(routes.items())}
+    }
+
+
+def run_flask(flask_app, clients, requests_per_client, seed, warmup):
+    """Closed-loop clients, one thread each, against the Flask app"""
+    samples = []
+    lock = threading.Lock()
+
+    def client(n):
+        workload = Workload(n, seed)
+        test_client = flask_app.test_client()
+        for i in range(warmup + requests_per_client):
+            route, method, path, body, admin = workload.next_request()
+            headers = {'Authorization': f'Bearer {ADMIN_TOKEN}'} if admin else {}
+            started = time.perf_counter()
+            response = test_client.open(path, method=method, json=body, headers=headers)
+            latency = time.perf_counter() - started
+            workload.record(route, response.status_code, response.get_json(silent=True))
+            if i >= warmup:
+                with lock:
+                    samples.append((route, response.status_code, latency))
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+async def run_asgi(asgi_app, clients, requests_per_client, seed, warmup):
+    """Closed-loop clients, one task each, against the ASGI app"""
+    import httpx
+    samples = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi_app), base_url='http://worker') as http:
+        async def client(n):
+            workload = Workload(n, seed)
+            for i in range(warmup + requests_per_client):
+                route, method, path, body, admin = workload.next_request()
+                headers = {'Authorization': f'Bearer {ADMIN_TOKEN}'} if admin else {}
+                started = time.perf_counter()
+                response = await http.request(method, path, json=body, headers=headers)
+                latency = time.perf_counter() - started
+                try:
+                    payload = response.json()
+                except ValueError:
+                    payload = None
+                workload.record(route, response.status_code, payload)
+                if i >= warmup:
+                    samples.append((route, response.status_code, latency))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(n) for n in range(clients)))
+    return samples, time.perf_counter() - started
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=16, help='concurrent closed-loop clients')
+    parser.add_argument('--requests', type=int, default=50, help='measured requests per client')
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per client first')
+    parser.add_argument('--latency-ms', type=float, default=20, help='stand-in Supabase latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=5, help='extra random Supabase latency, up to this')
+    parser.add_argument('--model-ms', type=float, default=150, help='stub model time per generate batch')
+    parser.add_argument('--mode', choices=('flask', 'asgi'), default='flask')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help='app environment variable, set before the app is imported')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    stand_in = StandInSupabase(args.latency_ms, args.jitter_ms, seed=args.seed)
+    os.environ['SUPABASE_URL'] = stand_in.start()
+    # The stub replaces the model, so never load the real one
+    os.environ['MODEL_LOADING'] = 'lazy'
+    # Local storage engines start from the rows the stand-in serves
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as seed:
+        json.dump(fixture_tables(), seed)
+    os.environ['STORAGE_SEED'] = seed.name
+    for assignment in args.env:
+        name, _, value = assignment.partition('=')
+        os.environ[name] = value
+
+    # The app logs every request to stdout, which is kept for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        import app as flask_app
+        from metrics import SPANS
+        flask_app.chat_model = StubModel()
+        flask_app.chat_generator = StubScheduler(
+            args.model_ms,
+            max_batch_size=flask_app.GENERATION_BATCH_SIZE,
+            max_wait_ms=flask_app.GENERATION_BATCH_WAIT_MS,
+            max_length=flask_app.GENERATION_MAX_LENGTH
+        )
+
+        if args.mode == 'asgi':
+            import asgi
+            loop = asyncio.new_event_loop()
+            try:
+                samples, duration = loop.run_until_complete(
+                    run_asgi(asgi.app, args.clients, args.requests, args.seed, args.warmup))
+            finally:
+                loop.run_until_complete(asgi.get_supabase().close())
+                loop.close()
+        else:
+            samples, duration = run_flask(flask_app.app, args.clients, args.requests, args.seed, args.warmup)
+
+    report = {
+        'commit': current_commit(),
+        'config': {name: value for name, value in vars(args).items() if name != 'output'},
+        'duration_s': round(duration, 3),
+        **summarize(samples, duration),
+        'supabase_requests': stand_in.requests,
+        'generation': flask_app.chat_generator.stats(),
+        'spans': {name: {key: summary[key] for key in ('calls', 'p50_ms', 'p95_ms', 'p99_ms')}
+                  for name, summary in SPANS.snapshot().items()}
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
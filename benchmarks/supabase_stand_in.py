@@ -0,0 +1,271 @@
+"""A local stand-in for the parts of Supabase the app talks to.
+
+Serves PostgREST reads and writes on /rest/v1/<table> and GoTrue's
+/auth/v1/user over HTTP/1.1 keep-alive, from an asyncio server on a
+background thread, so the app's real Supabase client and its connection
+pool are exercised unchanged. Tables start from fixtures built out of the
+timetable in database.py, and every response waits latency_ms (plus up to
+jitter_ms) before it is sent.
+
+Supported PostgREST: select= projection; eq, neq, gt, gte, lt, lte, in and
+is filters, with not. and nested or=(...)/and(...); order= and limit=;
+single-object Accept; POST inserts, PATCH updates and DELETE, each returning
+the affected rows.
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qsl, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import TIMETABLE_ENTRIES
+
+FIELDS = ('day', 'period', 'start_time', 'end_time', 'subject', 'room')
+ADMIN_USER_ID = '00000000-0000-0000-0000-000000000001'
+ADMIN_TOKEN = 'load-test-admin-token'
+DAYS = ['MON', 'TUE', 'WED', 'THU', 'FRI']
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+SCHEDULE_TABLES = ['schedule_54321', 'schedule_65432', 'schedule_76543']
+# Primary key per table; the rest are keyed on an integer id
+TABLE_KEYS = {'courses': 'code', 'user_roles': 'user_id'}
+FIXTURE_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def created_at(n):
+    return (FIXTURE_EPOCH + timedelta(seconds=n)).isoformat()
+
+
+def fixture_tables():
+    """Fresh fixture rows for every table the app reads"""
+    rows = [dict(zip(FIELDS, entry), id=i + 1, created_at=created_at(i))
+            for i, entry in enumerate(TIMETABLE_ENTRIES)]
+    subjects = sorted({row['subject'] for row in rows if row['subject'] != 'LUNCH'})
+    courses = [{'code': f'CS{601 + i}', 'name': subject.title(), 'description': '', 'semester': 'S6',
+                'created_at': created_at(i)} for i, subject in enumerate(subjects)]
+    # Evening lab slots in rooms of their own, so they never clash with the timetable
+    course_schedules = [{'id': i + 1, 'course_code': course['code'], 'day_of_week': WEEKDAY_NAMES[i % 5],
+                         'start_time': '5:00', 'end_time': '5:50', 'room': f'LAB-{i + 1}',
+                         'instructor': f'Instructor {i + 1}', 'created_at': created_at(i)}
+                        for i, course in enumerate(courses)]
+    tables = {
+        'schedules': rows,
+        'courses': courses,
+        'course_schedules': course_schedules,
+        'user_roles': [{'user_id': ADMIN_USER_ID, 'role': 'admin'}]
+    }
+    # The timetable is split across the per-course tables the chat path reads
+    for i, table in enumerate(SCHEDULE_TABLES):
+        tables[table] = [dict(row) for row in rows[i::len(SCHEDULE_TABLES)]]
+    return tables
+
+
+def split_top_level(text):
+    """Split on commas that are not inside parentheses or double quotes"""
+    parts, depth, quoted, current = [], 0, False, ''
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == ',':
+            parts.append(current)
+            current = ''
+            continue
+        current += char
+    parts.append(current)
+    return parts
+
+
+def coerce(text, like):
+    """Read a filter value as the type of the column value it is compared with"""
+    text = text.strip('"')
+    if isinstance(like, bool):
+        return text == 'true'
+    if isinstance(like, int):
+        try:
+            return int(text)
+        except ValueError:
+            return text
+    return text
+
+
+def compare(op, value, text):
+    if op == 'is':
+        return value is None if text == 'null' else str(value).lower() == text
+    if op == 'in':
+        return value in [coerce(item, value) for item in split_top_level(text[1:-1])]
+    if value is None:
+        return False
+    other = coerce(text, value)
+    if type(other) is not type(value):
+        value, other = str(value), str(other)
+    return {
+        'eq': value == other,
+        'neq': value != other,
+        'gt': value > other,
+        'gte': value >= other,
+        'lt': value < other,
+        'lte': value <= other
+    }[op]
+
+
+def predicate(column, expression):
+    """Row test for one PostgREST filter, e.g. ('day', 'eq.MON') or ('or', '(a.gt.1,b.eq.2)')"""
+    if column in ('or', 'and', 'not.or', 'not.and'):
+        negate = column.startswith('not.')
+        tests = [nested_predicate(part) for part in split_top_level(expression[1:-1])]
+        combine = any if column.endswith('or') else all
+        return lambda row: combine(test(row) for test in tests) != negate
+    op, _, text = expression.partition('.')
+    negate = op == 'not'
+    if negate:
+        op, _, text = text.partition('.')
+    return lambda row: compare(op, row.get(column), text) != negate
+
+
+def nested_predicate(part):
+    """A term inside or=(...): 'col.op.value' or a nested 'and(...)'/'or(...)'"""
+    for group in ('and', 'or', 'not.and', 'not.or'):
+        if part.startswith(group + '('):
+            return predicate(group, part[len(group):])
+    column, _, expression = part.partition('.')
+    return predicate(column.strip('"'), expression)
+
+
+class StandInSupabase:
+    """Just enough PostgREST and GoTrue to serve the app's routes"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, seed=0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.random = random.Random(seed)
+        self.tables = fixture_tables()
+        self.requests = 0
+        self.url = None
+
+    def start(self):
+        """Serve on an ephemeral localhost port from a background thread and return the base URL"""
+        ready = threading.Event()
+
+        def serve():
+            loop = asyncio.new_event_loop()
+            server = loop.run_until_complete(asyncio.start_server(self.handle, '127.0.0.1', 0))
+            self.url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=serve, name='stand-in-supabase', daemon=True).start()
+        ready.wait()
+        return self.url
+
+    async def handle(self, reader, writer):
+        # One connection serves requests until the client closes it (keep-alive)
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, target, _ = request_line.decode().split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, value = line.decode().split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+            body = b''
+            if int(headers.get('content-length', 0)):
+                body = await reader.readexactly(int(headers['content-length']))
+
+            self.requests += 1
+            status, payload = self.respond(method, target, headers, body)
+            await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+            body = json.dumps(payload).encode()
+            writer.write(f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+        writer.close()
+
+    def respond(self, method, target, headers, body):
+        url = urlsplit(target)
+        if url.path == '/auth/v1/user':
+            if headers.get('authorization') != f'Bearer {ADMIN_TOKEN}':
+                return 401, {'code': 401, 'msg': 'invalid JWT: unable to parse or verify signature'}
+            return 200, {
+                'id': ADMIN_USER_ID,
+                'aud': 'authenticated',
+                'role': 'authenticated',
+                'email': 'admin@example.com',
+                'app_metadata': {},
+                'user_metadata': {},
+                'created_at': '2024-01-01T00:00:00Z'
+            }
+        table = url.path[len('/rest/v1/'):] if url.path.startswith('/rest/v1/') else None
+        if table not in self.tables:
+            return 404, {'code': '42P01', 'message': f'relation "{table}" does not exist'}
+
+        params = parse_qsl(url.query, keep_blank_values=True)
+        if method == 'POST':
+            status, rows = self.insert(table, json.loads(body or b'[]'))
+        else:
+            rows = self.select(table, params)
+            if method == 'PATCH':
+                changes = json.loads(body or b'{}')
+                for row in rows:
+                    row.update(changes)
+            elif method == 'DELETE':
+                deleted = {id(row) for row in rows}
+                self.tables[table] = [row for row in self.tables[table] if id(row) not in deleted]
+            status = 200
+            rows = self.shape(rows, params)
+
+        if 'vnd.pgrst.object' in headers.get('accept', ''):
+            if len(rows) != 1:
+                return 406, {'code': 'PGRST116', 'message': 'JSON object requested, multiple (or no) rows returned'}
+            return status, rows[0]
+        return status, rows
+
+    def select(self, table, params):
+        """The stored rows matching every filter (the row dicts themselves, for writes)"""
+        rows = self.tables[table]
+        for column, expression in params:
+            if column not in ('select', 'order', 'limit', 'offset', 'columns'):
+                test = predicate(column, expression)
+                rows = [row for row in rows if test(row)]
+        return rows
+
+    @staticmethod
+    def shape(rows, params):
+        """Apply order=, offset=, limit= and select= to a result"""
+        params = dict(params)
+        for term in reversed(params.get('order', '').split(',') if params.get('order') else []):
+            column, *modifiers = term.split('.')
+            rows = sorted(rows, key=lambda row: (row.get(column) is None, row.get(column)),
+                          reverse='desc' in modifiers)
+        offset = int(params.get('offset', 0))
+        rows = rows[offset:offset + int(params['limit'])] if 'limit' in params else rows[offset:]
+        columns = [column.strip() for column in params.get('select', '*').split(',')]
+        if '*' in columns:
+            return [dict(row) for row in rows]
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    def insert(self, table, payload):
+        key = TABLE_KEYS.get(table, 'id')
+        stored = self.tables[table]
+        inserted = []
+        for row in payload if isinstance(payload, list) else [payload]:
+            row = dict(row)
+            if key == 'id' and row.get('id') is None:
+                row['id'] = max((existing['id'] for existing in stored), default=0) + 1
+            if any(existing.get(key) == row[key] for existing in stored):
+                return 409, {'code': '23505', 'message': f'duplicate key value violates unique constraint "{table}_pkey"'}
+            row.setdefault('created_at', datetime.now(timezone.utc).isoformat())
+            stored.append(row)
+            inserted.append(dict(row))
+        return 201, inserted
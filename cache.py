@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a fixed time-to-live"""
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        # Generation of the last full invalidation, and of each key invalidated since
+        self._cleared_at = 0
+        self._invalidated_keys = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self):
+        """Counter bumped on every invalidation, used to drop stale fills"""
+        return self._generation
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None, generation=None):
+        """Store a value; skipped if the cache, or this key, was invalidated since generation"""
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and (generation < self._cleared_at or
+                                           generation < self._invalidated_keys.get(key, 0)):
+                return
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Drop a single key, or every entry when no key is given.
+
+        In-flight fills are dropped only for what was invalidated: for the
+        key alone, or for every key on a full invalidation.
+        """
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if key is None:
+                self._data.clear()
+                self._invalidated_keys.clear()
+                self._cleared_at = self._generation
+            else:
+                self._data.pop(key, None)
+                self._invalidated_keys[key] = self._generation
+                self._invalidated_keys.move_to_end(key)
+                if len(self._invalidated_keys) > self.maxsize:
+                    # Forgetting the oldest key's invalidation stays safe by
+                    # dropping every fill that started before it
+                    _, generation = self._invalidated_keys.popitem(last=False)
+                    self._cleared_at = max(self._cleared_at, generation)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Return hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
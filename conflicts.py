@@ -0,0 +1,142 @@
+from bisect import bisect_left, insort
+
+from schedule_index import row_span
+
+
+def day_code(day):
+    """Normalize 'Monday', 'monday' or 'MON' to 'MON'"""
+    return str(day or '').strip()[:3].upper()
+
+
+def slot_from_row(row, source):
+    """Reduce a schedules or course_schedules row to the fields conflicts are checked on"""
+    start, end = row_span(row)
+    return {
+        'source': source,
+        'id': row.get('id'),
+        'label': row.get('subject') or row.get('course_code'),
+        'day': day_code(row.get('day') or row.get('day_of_week')),
+        'start': start,
+        'end': end,
+        'start_time': row.get('start_time'),
+        'end_time': row.get('end_time'),
+        'room': (row.get('room') or '').strip().upper(),
+        'instructor': (row.get('instructor') or '').strip().lower()
+    }
+
+
+class IntervalList:
+    """Intervals sorted by start, with a running maximum of end times.
+
+    The running maximum lets an overlap probe stop after one bisect when the
+    slot is free, and walk back only over intervals that can still overlap.
+    """
+
+    __slots__ = ('entries', 'starts', 'max_ends')
+
+    def __init__(self, slots=()):
+        # The sequence number is unique, so tuples never compare the slot dicts
+        self.entries = sorted((slot['start'], slot['end'], i, slot) for i, slot in enumerate(slots))
+        self._reindex()
+
+    def _reindex(self):
+        self.starts = [entry[0] for entry in self.entries]
+        self.max_ends = []
+        running = -1
+        for entry in self.entries:
+            running = max(running, entry[1])
+            self.max_ends.append(running)
+
+    def add(self, slot):
+        insort(self.entries, (slot['start'], slot['end'], len(self.entries), slot))
+        self._reindex()
+
+    def overlapping(self, start, end):
+        """Return the slots overlapping [start, end); touching ends do not overlap"""
+        hits = []
+        i = bisect_left(self.starts, end) - 1
+        while i >= 0 and self.max_ends[i] > start:
+            if self.entries[i][1] > start:
+                hits.append(self.entries[i][3])
+            i -= 1
+        return hits
+
+    def overlapping_pairs(self):
+        """Every pair of overlapping slots in the list"""
+        pairs = []
+        for j, (start, end, _, slot) in enumerate(self.entries):
+            i = j - 1
+            while i >= 0 and self.max_ends[i] > start:
+                if self.entries[i][1] > start:
+                    pairs.append((self.entries[i][3], slot))
+                i -= 1
+        return pairs
+
+
+class ConflictIndex:
+    """Per-room and per-instructor interval lists for each weekday"""
+
+    KINDS = ('room', 'instructor')
+
+    def __init__(self, slots=()):
+        buckets = {}
+        for slot in slots:
+            for key in self._keys(slot):
+                buckets.setdefault(key, []).append(slot)
+        self.buckets = {key: IntervalList(bucket) for key, bucket in buckets.items()}
+
+    @classmethod
+    def _keys(cls, slot):
+        if slot['end'] <= slot['start']:
+            return []
+        return [(kind, slot['day'], slot[kind]) for kind in cls.KINDS if slot[kind]]
+
+    def add(self, slot):
+        """Index one more slot, e.g. while validating a batch"""
+        for key in self._keys(slot):
+            self.buckets.setdefault(key, IntervalList()).add(slot)
+
+    def check(self, slot, exclude=None):
+        """Return conflicts for a proposed slot, skipping the (source, id) being replaced"""
+        conflicts = []
+        for key in self._keys(slot):
+            bucket = self.buckets.get(key)
+            if not bucket:
+                continue
+            for other in bucket.overlapping(slot['start'], slot['end']):
+                if exclude and (other['source'], other['id']) == exclude:
+                    continue
+                conflicts.append(self._describe(key, other))
+        return conflicts
+
+    def report(self):
+        """Every overlapping pair of bookings, grouped by what they collide on"""
+        conflicts = []
+        for key, bucket in sorted(self.buckets.items(), key=lambda item: item[0]):
+            for first, second in bucket.overlapping_pairs():
+                kind, day, value = key
+                conflicts.append({
+                    'type': kind,
+                    kind: value,
+                    'day': day,
+                    'bookings': [self._public(first), self._public(second)]
+                })
+        return conflicts
+
+    @classmethod
+    def _describe(cls, key, other):
+        kind, day, value = key
+        return {'type': kind, kind: value, 'day': day, 'with': cls._public(other)}
+
+    @staticmethod
+    def _public(slot):
+        return {
+            'source': slot['source'],
+            'id': slot['id'],
+            'label': slot['label'],
+            'day': slot['day'],
+            'start_time': slot['start_time'],
+            'end_time': slot['end_time'],
+            'room': slot['room'] or None,
+            'instructor': slot['instructor'] or None
+        }
@@ -1,5 +1,49 @@
 import sqlite3
 
+from schedule_index import timetable_problems
+
+# Timetable data: (day, period, start_time, end_time, subject, room)
+TIMETABLE_ENTRIES = [
+    # MONDAY
+    ('MON', 2, '9:50', '10:40', 'SOFT SKILLS', 'S302/S303'),
+    ('MON', 3, '10:50', '11:40', 'DISTRIBUTED SYSTEMS', 'FF LAB'),
+    ('MON', 5, '12:30', '1:20', 'LUNCH', ''),
+    ('MON', 6, '1:20', '2:10', 'CLOUD', 'N106'),
+    ('MON', 7, '2:10', '3:00', 'DISTRIBUTED SYSTEMS', 'N106'),
+    ('MON', 9, '4:00', '4:50', 'CLOUD', 'N106'),
+    # TUESDAY
+    ('TUE', 1, '9:00', '9:50', 'DISTRIBUTED SYSTEMS', 'N106'),
+    ('TUE', 2, '9:50', '10:40', 'COMPUTER SECURITY', 'N302'),
+    ('TUE', 3, '10:50', '11:40', 'PRINCIPLES OF PL', 'N106'),
+    ('TUE', 5, '12:30', '1:20', 'SOFTWARE ENGG', 'N106'),
+    # LUNCH (period 4)
+    # Period 6, 7, 8, 9 are empty
+    # WEDNESDAY
+    ('WED', 2, '9:50', '10:40', 'COMPUTER SECURITY', 'N106'),
+    ('WED', 5, '12:30', '1:20', 'SOFTWARE ENGG', 'N106'),
+    ('WED', 6, '1:20', '2:10', 'FULL STACK', 'N103'),
+    ('WED', 7, '2:10', '3:00', 'WIRELESS', 'N106'),
+    # LLM S311 C, SNA N106, SNS N106, PRINCIPLES OF PL FF LAB (periods 4, 8)
+    # THURSDAY
+    ('THU', 1, '9:00', '9:50', 'PRINCIPLES OF PL', 'N306'),
+    ('THU', 2, '9:50', '10:40', 'FULL STACK', 'N103'),
+    ('THU', 3, '10:50', '11:40', 'WIRELESS', 'N106'),
+    ('THU', 4, '11:40', '12:30', 'SNS', 'N103'),
+    ('THU', 5, '12:30', '1:20', 'LUNCH', ''),
+    ('THU', 6, '1:20', '2:10', 'DISTRIBUTED SYSTEMS', 'N106'),
+    ('THU', 7, '2:10', '3:00', 'CLOUD', 'N106'),
+    ('THU', 8, '3:10', '4:00', 'SOFTWARE ENGG', 'A207 B'),
+    # FRIDAY
+    ('FRI', 1, '9:00', '9:50', 'VERBAL', 'N301 | N309 B'),
+    ('FRI', 2, '9:50', '10:40', 'FULL STACK', 'N103'),
+    ('FRI', 3, '10:50', '11:40', 'WIRELESS', 'N106'),
+    ('FRI', 4, '11:40', '12:30', 'COMPUTER SECURITY', 'N302'),
+    ('FRI', 5, '12:30', '1:20', 'LUNCH', ''),
+    ('FRI', 6, '1:20', '2:10', 'SNS', 'N103'),
+    ('FRI', 7, '2:10', '3:00', 'SNA', 'N106'),
+    ('FRI', 8, '3:10', '4:00', 'APTITUDE', 'N307'),
+]
+
 def get_db_connection():
     conn = sqlite3.connect('campus.db')
     conn.row_factory = sqlite3.Row
@@ -76,6 +120,82 @@ def create_class_schedule_table(class_code):
     conn.commit()
     conn.close()
 
+# Column layouts of the app's tables, as (primary key, columns, lookup columns,
+# integer columns), for the SQLite and in-memory storage engines and the read
+# replica. schedules and the schedule_<code> tables have the timetable layout.
+# Lookup columns are the ones reads filter on, which both local engines index;
+# integer columns are stored as numbers even when a JSON body sends "7".
+TABLE_LAYOUTS = {
+    'courses': ('code', ('code', 'name', 'description', 'semester', 'created_at'), (), ()),
+    'timetable': ('id', ('id', 'day', 'period', 'start_time', 'end_time', 'subject', 'room', 'created_at'), ('day',), ('id', 'period')),
+    'course_schedules': ('id', ('id', 'course_code', 'day_of_week', 'start_time', 'end_time', 'room', 'instructor', 'created_at'), ('course_code',), ('id',)),
+    'user_roles': ('user_id', ('user_id', 'role', 'created_at'), (), ()),
+}
+
+def create_storage_table(conn, table, layout):
+    """Create a table with one of TABLE_LAYOUTS and the indexes its read paths filter and page on"""
+    if layout == 'courses':
+        conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            code TEXT PRIMARY KEY,
+            name TEXT,
+            description TEXT,
+            semester TEXT,
+            created_at TIMESTAMP
+        )
+        ''')
+    elif layout == 'timetable':
+        conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY,
+            day TEXT,
+            period INTEGER,
+            start_time TEXT,
+            end_time TEXT,
+            subject TEXT,
+            room TEXT,
+            created_at TIMESTAMP
+        )
+        ''')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_day_period ON {table} (day, period)')
+    elif layout == 'course_schedules':
+        conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY,
+            course_code TEXT,
+            day_of_week TEXT,
+            start_time TEXT,
+            end_time TEXT,
+            room TEXT,
+            instructor TEXT,
+            created_at TIMESTAMP
+        )
+        ''')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_course_code ON {table} (course_code, id)')
+    elif layout == 'user_roles':
+        conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            user_id TEXT PRIMARY KEY,
+            role TEXT,
+            created_at TIMESTAMP
+        )
+        ''')
+    else:
+        raise ValueError(f"Unknown table layout: {layout}")
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {table}_created_at ON {table} (created_at)')
+
+def create_replica_state_table(conn):
+    """Per-table sync progress, so a restarted replica serves its last copy at once"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS replica_state (
+        table_name TEXT PRIMARY KEY,
+        change_column TEXT,
+        watermark TEXT,
+        digest TEXT,
+        synced_at REAL
+    )
+    ''')
+
 def get_all_courses():
     """Get list of all courses"""
     conn = get_db_connection()
@@ -131,55 +251,17 @@ def insert_sample_data():
     conn.close()
 
 def insert_timetable_data():
+    problems = timetable_problems(TIMETABLE_ENTRIES)
+    if problems:
+        raise ValueError("Timetable has bad times:\n" + "\n".join(problems))
     conn = get_db_connection()
     cursor = conn.cursor()
     # Clear existing timetable data
     cursor.execute('DELETE FROM timetable')
-    # Timetable data: (day, period, start_time, end_time, subject, room)
-    timetable_entries = [
-        # MONDAY
-        ('MON', 2, '9:50', '10:40', 'SOFT SKILLS', 'S302/S303'),
-        ('MON', 3, '10:50', '11:40', 'DISTRIBUTED SYSTEMS', 'FF LAB'),
-        ('MON', 5, '12:30', '1:20', 'LUNCH', ''),
-        ('MON', 6, '1:20', '2:10', 'CLOUD', 'N106'),
-        ('MON', 7, '2:10', '3:00', 'DISTRIBUTED SYSTEMS', 'N106'),
-        ('MON', 9, '4:00', '4:50', 'CLOUD', 'N106'),
-        # TUESDAY
-        ('TUE', 1, '9:00', '9:50', 'DISTRIBUTED SYSTEMS', 'N106'),
-        ('TUE', 2, '9:50', '10:40', 'COMPUTER SECURITY', 'N302'),
-        ('TUE', 3, '10:50', '11:40', 'PRINCIPLES OF PL', 'N106'),
-        ('TUE', 5, '12:30', '1:20', 'SOFTWARE ENGG', 'N106'),
-        # LUNCH (period 4)
-        # Period 6, 7, 8, 9 are empty
-        # WEDNESDAY
-        ('WED', 2, '9:50', '10:40', 'COMPUTER SECURITY', 'N106'),
-        ('WED', 5, '12:30', '1:20', 'SOFTWARE ENGG', 'N106'),
-        ('WED', 6, '1:20', '2:10', 'FULL STACK', 'N103'),
-        ('WED', 7, '2:10', '3:00', 'WIRELESS', 'N106'),
-        # LLM S311 C, SNA N106, SNS N106, PRINCIPLES OF PL FF LAB (periods 4, 8)
-        # THURSDAY
-        ('THU', 1, '9:00', '9:50', 'PRINCIPLES OF PL', 'N306'),
-        ('THU', 2, '9:50', '10:40', 'FULL STACK', 'N103'),
-        ('THU', 3, '10:50', '11:40', 'WIRELESS', 'N106'),
-        ('THU', 4, '11:40', '12:30', 'SNS', 'N103'),
-        ('THU', 5, '12:30', '1:20', 'LUNCH', ''),
-        ('THU', 6, '1:20', '2:10', 'DISTRIBUTED SYSTEMS', 'N106'),
-        ('THU', 7, '2:10', '3:00', 'CLOUD', 'N106'),
-        ('THU', 8, '3:10', '4:00', 'SOFTWARE ENGG', 'A207 B'),
-        # FRIDAY
-        ('FRI', 1, '9:00', '9:50', 'VERBAL', 'N301 | N309 B'),
-        ('FRI', 2, '9:50', '10:40', 'FULL STACK', 'N103'),
-        ('FRI', 3, '10:50', '11:40', 'WIRELESS', 'N106'),
-        ('FRI', 4, '11:40', '12:30', 'COMPUTER SECURITY', 'N302'),
-        ('FRI', 5, '12:30', '1:20', 'LUNCH', ''),
-        ('FRI', 6, '1:20', '2:10', 'SNS', 'N103'),
-        ('FRI', 7, '2:10', '3:00', 'SNA', 'N106'),
-        ('FRI', 8, '3:10', '4:00', 'APTITUDE', 'N307'),
-    ]
     cursor.executemany('''
         INSERT INTO timetable (day, period, start_time, end_time, subject, room)
         VALUES (?, ?, ?, ?, ?, ?)
-    ''', timetable_entries)
+    ''', TIMETABLE_ENTRIES)
     conn.commit()
     conn.close()
 
@@ -0,0 +1,285 @@
+import io
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+
+from metrics import span
+
+QUANTIZATION_PROBE = "Hi! How are you doing today?"
+
+
+def linear_from_conv1d(model):
+    """Swap GPT-2 style Conv1D projections for equivalent nn.Linear layers.
+
+    DialoGPT's attention and MLP blocks use transformers' Conv1D, which
+    quantize_dynamic does not recognise; as nn.Linear they get quantized too.
+    """
+    from transformers.pytorch_utils import Conv1D
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features)
+                # Conv1D stores its weight as (in, out), Linear as (out, in)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(parent, name, linear)
+    return model
+
+
+def model_size_mb(model):
+    """Serialized state_dict size, which also counts packed int8 weights"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return round(buffer.tell() / 1024 / 1024, 1)
+
+
+def probe_latency_ms(model, tokenizer, new_tokens=20):
+    """Time one greedy generate of a fixed prompt"""
+    inputs = tokenizer.encode(QUANTIZATION_PROBE + tokenizer.eos_token, return_tensors='pt')
+    started = time.perf_counter()
+    with torch.no_grad():
+        model.generate(inputs, max_new_tokens=new_tokens, min_new_tokens=new_tokens,
+                       do_sample=False, pad_token_id=tokenizer.eos_token_id)
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+class ModelLoader:
+    """Loads the chat model off the request path and reports its state"""
+
+    def __init__(self, model_name, quantize=None, threads=None):
+        self.model_name = model_name
+        self.quantize = quantize
+        self.threads = threads
+        self.state = 'pending'
+        self.model = None
+        self.tokenizer = None
+        self.error = None
+        self.load_seconds = None
+        self.quantization = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def start(self, background=True):
+        """Begin loading once; in the background unless background is False"""
+        with self._lock:
+            if self.state != 'pending':
+                return
+            self.state = 'loading'
+        if background:
+            threading.Thread(target=self._load, name='model-loader', daemon=True).start()
+        else:
+            self._load()
+
+    def _load(self):
+        print(f"Loading AI model {self.model_name}... This may take a minute...")
+        started = time.perf_counter()
+        try:
+            # Importing transformers alone takes seconds, so it happens here too
+            from transformers import AutoTokenizer, AutoModelForCausalLM
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            model = AutoModelForCausalLM.from_pretrained(self.model_name)
+            model.eval()
+            if self.threads:
+                # Several gunicorn workers share the cores; don't let each claim all of them
+                torch.set_num_threads(self.threads)
+            if self.quantize == 'int8':
+                model = self._quantize(model, tokenizer)
+            self.model, self.tokenizer = model, tokenizer
+            self.state = 'ready'
+            print(f"Model loaded successfully in {time.perf_counter() - started:.1f}s!")
+        except Exception as e:
+            self.error = str(e)
+            self.state = 'failed'
+            print(f"Error loading model: {e}")
+        finally:
+            self.load_seconds = round(time.perf_counter() - started, 3)
+            self._ready.set()
+
+    def _quantize(self, model, tokenizer):
+        """Apply dynamic int8 quantization to the linear layers, reporting the change against fp32"""
+        before = {'size_mb': model_size_mb(model), 'latency_ms': probe_latency_ms(model, tokenizer)}
+        model = torch.quantization.quantize_dynamic(
+            linear_from_conv1d(model), {torch.nn.Linear}, dtype=torch.qint8
+        )
+        after = {'size_mb': model_size_mb(model), 'latency_ms': probe_latency_ms(model, tokenizer)}
+        self.quantization = {'mode': 'int8', 'fp32': before, 'int8': after}
+        print(f"Quantized model to int8: {before['size_mb']}MB -> {after['size_mb']}MB, "
+              f"probe generate {before['latency_ms']}ms -> {after['latency_ms']}ms")
+        return model
+
+    def get(self, wait=0):
+        """Return (model, tokenizer), or (None, None) if not ready within wait seconds"""
+        if self.state == 'pending':
+            self.start()
+        if wait and not self._ready.is_set():
+            self._ready.wait(wait)
+        if self.state == 'ready':
+            return self.model, self.tokenizer
+        return None, None
+
+    def status(self):
+        return {
+            'name': self.model_name,
+            'state': self.state,
+            'load_seconds': self.load_seconds,
+            'threads': torch.get_num_threads(),
+            'quantization': self.quantization or {'mode': 'fp32'},
+            'error': self.error
+        }
+
+
+class BatchScheduler:
+    """Groups concurrent generate calls into padded batches run by one worker thread.
+
+    The worker takes the first queued prompt, then keeps collecting until it
+    has max_batch_size prompts or max_wait_ms has passed, and runs a single
+    model.generate over the left-padded batch.
+    """
+
+    def __init__(self, loader, max_batch_size=8, max_wait_ms=10, max_length=150, generate_kwargs=None):
+        self.loader = loader
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.max_length = max_length
+        self.generate_kwargs = generate_kwargs or {}
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.largest_batch = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='generate-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, prompt):
+        """Queue a prompt and return a Future for its reply text"""
+        self.start()
+        future = Future()
+        self._queue.put((prompt, future))
+        return future
+
+    def generate(self, prompt, timeout=None):
+        """Queue a prompt and wait for its reply"""
+        future = self.submit(prompt)
+        try:
+            return future.result(timeout)
+        except Exception:
+            # A caller that gave up should not cost the worker a generation
+            future.cancel()
+            raise
+
+    def stream(self, prompt, timeout=None):
+        """Yield reply text as the model produces it.
+
+        Streams run one prompt at a time beside the batch worker, since the
+        streamer can only follow a single sequence.
+        """
+        from transformers import TextIteratorStreamer
+        model, tokenizer = self.loader.get()
+        if model is None or tokenizer is None:
+            raise RuntimeError('Chat model is not loaded')
+        input_ids = tokenizer.encode(prompt + tokenizer.eos_token, return_tensors='pt')
+        # timeout bounds the wait for each piece, so a failed generate can't hang the stream
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True, timeout=timeout)
+        kwargs = dict(
+            self.generate_kwargs,
+            inputs=input_ids,
+            max_new_tokens=max(1, self.max_length - input_ids.shape[1]),
+            pad_token_id=tokenizer.eos_token_id,
+            streamer=streamer
+        )
+        errors = []
+        threading.Thread(target=self._generate_streaming, args=(model, kwargs, errors),
+                         name='generate-stream', daemon=True).start()
+        for text in streamer:
+            if text:
+                yield text
+        if errors:
+            raise errors[0]
+
+    @staticmethod
+    def _generate_streaming(model, kwargs, errors):
+        try:
+            with torch.no_grad(), span('model.generate'):
+                model.generate(**kwargs)
+        except Exception as e:
+            print(f"Error streaming generation: {e}")
+            errors.append(e)
+            # generate only ends the streamer when it finishes, so end it here
+            # rather than leave the reader waiting out its timeout
+            kwargs['streamer'].end()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [(prompt, future) for prompt, future in self._collect()
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                replies = self._generate_batch([prompt for prompt, _ in batch])
+            except Exception as e:
+                print(f"Error generating batch of {len(batch)}: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), reply in zip(batch, replies):
+                future.set_result(reply)
+            self.batches += 1
+            self.requests += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def _generate_batch(self, prompts):
+        model, tokenizer = self.loader.get()
+        if model is None or tokenizer is None:
+            raise RuntimeError('Chat model is not loaded')
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        # Decoder-only models continue from the right edge, so pad on the left
+        tokenizer.padding_side = 'left'
+        encoded = tokenizer([prompt + tokenizer.eos_token for prompt in prompts],
+                            return_tensors='pt', padding=True)
+        # Each prompt keeps the budget it would have had alone under max_length
+        budgets = [max(1, self.max_length - length) for length in encoded['attention_mask'].sum(dim=1).tolist()]
+        with torch.no_grad(), span('model.generate'):
+            outputs = model.generate(
+                encoded['input_ids'],
+                attention_mask=encoded['attention_mask'],
+                max_new_tokens=max(budgets),
+                pad_token_id=tokenizer.eos_token_id,
+                **self.generate_kwargs
+            )
+        width = encoded['input_ids'].shape[1]
+        return [tokenizer.decode(output[width:width + budget], skip_special_tokens=True)
+                for output, budget in zip(outputs, budgets)]
+
+    def stats(self):
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': round(self.max_wait * 1000, 3),
+            'batches': self.batches,
+            'requests': self.requests,
+            'average_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'queued': self._queue.qsize()
+        }
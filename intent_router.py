@@ -0,0 +1,227 @@
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+# Parsed utterance: intent name plus day, ordinal and subject slots.
+# Relative days stay symbolic ('tomorrow') and are resolved when answering.
+Intent = namedtuple('Intent', ['name', 'day', 'ordinal', 'subject'])
+
+DAY_CODES = {
+    'monday': 'MON',
+    'tuesday': 'TUE',
+    'wednesday': 'WED',
+    'thursday': 'THU',
+    'friday': 'FRI',
+    'saturday': None,  # No classes on weekends
+    'sunday': None     # No classes on weekends
+}
+
+RELATIVE_DAYS = ['tomorrow', 'today', 'yesterday']
+
+ORDINAL_NUMBERS = {
+    'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5,
+    '1st': 1, '2nd': 2, '3rd': 3, '4th': 4, '5th': 5,
+    'last': -1
+}
+
+FRIENDLY_INTENTS = ['greeting', 'how_are_you', 'thanks', 'goodbye']
+
+PHRASES = {
+    'greeting': ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening'],
+    'how_are_you': ['how are you'],
+    'thanks': ['thank', 'thanks', 'thx'],
+    'goodbye': ['bye', 'goodbye', 'see you', 'cya'],
+    'relative_day': RELATIVE_DAYS,
+    'weekday': list(DAY_CODES) + [day + 's' for day in DAY_CODES],
+    'ordinal': list(ORDINAL_NUMBERS),
+    'schedule': ['schedule', 'classes', 'periods', 'lectures'],
+    'follow_up': [
+        'after that', 'following that', 'after this', 'what then', 'and then',
+        'what about after', 'what follows', 'what comes after', 'what is after',
+        'what class is after', 'what comes next', 'what is next after that'
+    ],
+    'next_class': ['next class', 'next period', 'upcoming class', 'following class'],
+    'current_class': ['current class', 'right now', 'this class', 'present class'],
+    'week': ['week', 'weekly', 'all'],
+    'where': ['where is', "where's", 'where are', 'where'],
+    'how_many': ['how many']
+}
+
+PHRASE_CATEGORY = {phrase: category for category, phrases in PHRASES.items() for phrase in phrases}
+
+# When several days or ordinals are mentioned the earliest in these orders wins
+DAY_RANK = {day: rank for rank, day in enumerate(RELATIVE_DAYS + list(DAY_CODES))}
+ORDINAL_RANK = {ordinal: rank for rank, ordinal in enumerate(ORDINAL_NUMBERS)}
+
+# Words trimmed from either end of a spoken subject ("where is my CLOUD class today")
+SUBJECT_FILLER = set(PHRASE_CATEGORY) | {
+    'a', 'an', 'the', 'my', 'our', 'is', 'are', 'do', 'does', 'i', 'we', 'have', 'has',
+    'on', 'in', 'for', 'of', 'this', 'that', 'class', 'lecture', 'period', 'times',
+    'there', 'held', 'located', 'room', 'at', 'next', 'it'
+}
+# Most words in one filler phrase, e.g. 2 for "right now"
+FILLER_SPAN = max(len(phrase.split()) for phrase in SUBJECT_FILLER)
+
+# Hesitations and politeness that don't change what an open-ended question asks
+FILLER_WORDS = {'um', 'umm', 'uh', 'uhh', 'uhm', 'erm', 'hmm', 'mm', 'please', 'pls', 'plz'}
+
+
+def normalize_utterance(text):
+    """Lowercase, drop punctuation and filler words, and collapse whitespace"""
+    words = (word.strip("'") for word in re.findall(r"[a-z0-9']+", text.lower()))
+    return ' '.join(word for word in words if word and word not in FILLER_WORDS)
+
+
+def phrase_trie_pattern(phrases):
+    """Build a regex alternation factored on common prefixes, so matching walks a trie"""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [(r'\s+' if char == ' ' else re.escape(char)) + build(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Optional continuation keeps the longest phrase at each position
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
+
+
+# One pass over the utterance: group 1 is any known phrase, group 2 the
+# digits of a numeric period reference such as "2nd class" or "3 period"
+INTENT_PATTERN = re.compile(
+    r'(?<![a-z0-9])(' + phrase_trie_pattern(PHRASE_CATEGORY) + r')\b'
+    r'|(\d+)(?:st|nd|rd|th)?\s*(?:class|period)'
+)
+
+
+def filler_span(words, from_end=False):
+    """Number of words at the start (or end) of words that form filler, longest phrase first"""
+    for size in range(min(FILLER_SPAN, len(words)), 0, -1):
+        if ' '.join(words[-size:] if from_end else words[:size]) in SUBJECT_FILLER:
+            return size
+    return 0
+
+
+def extract_subject(text):
+    """Trim filler words and phrases ("right now") from the ends of the text following a where/how-many trigger"""
+    words = [word.strip("?!.,'\"") for word in text.split()]
+    words = [word for word in words if word]
+    size = filler_span(words)
+    while size:
+        del words[:size]
+        size = filler_span(words)
+    size = filler_span(words, from_end=True)
+    while size:
+        del words[-size:]
+        size = filler_span(words, from_end=True)
+    return ' '.join(words) or None
+
+
+def subject_text(text, trigger):
+    """Return the part of the utterance following the where/how-many trigger"""
+    match = re.search(r'\b' + r'\s+'.join(map(re.escape, trigger.split())) + r'\b', text)
+    return text[match.end():] if match else ''
+
+
+def parse_intent(text):
+    """Classify an utterance and extract its slots in a single regex pass"""
+    text = text.lower()
+    found = {}
+    numeric = None
+    for phrase, digits in INTENT_PATTERN.findall(text):
+        if digits:
+            if numeric is None:
+                numeric = int(digits)
+            continue
+        category = PHRASE_CATEGORY.get(phrase)
+        if category is None:
+            phrase = ' '.join(phrase.split())
+            category = PHRASE_CATEGORY[phrase]
+        found.setdefault(category, []).append(phrase)
+
+    # Greetings and small talk only count as standalone short phrases
+    if found and len(text.split()) <= 3:
+        for name in FRIENDLY_INTENTS:
+            if name in found:
+                return Intent(name, None, None, None)
+
+    day = None
+    if 'relative_day' in found:
+        day = min(found['relative_day'], key=DAY_RANK.get)
+    elif 'weekday' in found:
+        days = [phrase if phrase in DAY_CODES else phrase[:-1] for phrase in found['weekday']]
+        day = min(days, key=DAY_RANK.get)
+
+    ordinal = None
+    if 'ordinal' in found:
+        ordinal = ORDINAL_NUMBERS[min(found['ordinal'], key=ORDINAL_RANK.get)]
+    elif numeric is not None:
+        ordinal = numeric
+    if ordinal is not None:
+        return Intent('nth_class', day, ordinal, None)
+
+    trigger = 'how_many' if 'how_many' in found else 'where' if 'where' in found else None
+    if trigger:
+        subject = extract_subject(subject_text(text, found[trigger][0]))
+        if subject:
+            name = 'count' if trigger == 'how_many' else 'location'
+            return Intent(name, day, None, subject)
+
+    if day:
+        return Intent('day_schedule', day, None, None)
+    for name in ('follow_up', 'next_class', 'current_class'):
+        if name in found:
+            return Intent(name, None, None, None)
+    if 'week' in found:
+        return Intent('week_schedule', None, None, None)
+    return Intent('unknown', None, None, None)
+
+
+def resolve_day(day, now=None):
+    """Resolve a day slot to (day_code, message), with weekend explanations"""
+    if day is None:
+        return None, None
+    now = now or datetime.now()
+
+    if day == 'tomorrow':
+        tomorrow = (now + timedelta(days=1)).strftime('%A').lower()
+        day_code = DAY_CODES.get(tomorrow)
+        if day_code is None:
+            if tomorrow in ['saturday', 'sunday']:
+                # If tomorrow is a weekend, look for the next weekday
+                days_to_add = 2 if tomorrow == 'saturday' else 1
+                next_weekday = (now + timedelta(days=days_to_add)).strftime('%A').lower()
+                day_code = DAY_CODES.get(next_weekday)
+                if day_code:
+                    return day_code, f"Since tomorrow is {tomorrow.capitalize()}, here's your schedule for {next_weekday.capitalize()}"
+                return None, "No classes on weekends! 🎉"
+            return None, "No classes tomorrow! 🎉"
+        return day_code, None
+    elif day == 'today':
+        current_day = now.strftime('%A').lower()
+        day_code = DAY_CODES.get(current_day)
+        if day_code is None:
+            if current_day in ['saturday', 'sunday']:
+                return None, "It's the weekend - no classes today! 🎉"
+            return None, "No classes today! 🎉"
+        return day_code, None
+    elif day == 'yesterday':
+        yesterday = (now - timedelta(days=1)).strftime('%A').lower()
+        day_code = DAY_CODES.get(yesterday)
+        if day_code is None:
+            if yesterday in ['saturday', 'sunday']:
+                return None, "That was the weekend - no classes! 🎉"
+            return None, "No classes yesterday! 🎉"
+        return day_code, None
+
+    day_code = DAY_CODES.get(day)
+    if day_code is None:
+        return None, f"No classes on {day.capitalize()}! 🎉"
+    return day_code, None
@@ -0,0 +1,167 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from a fast cache-warm read to a stalled request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Latency histogram over fixed buckets, with an overflow bucket past the last bound"""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'errors')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+
+    def observe(self, seconds, error=False):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if error:
+            self.errors += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside the bucket that holds it"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                if i == len(self.buckets):
+                    # Nothing is known above the last bound
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def snapshot(self):
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            running += count
+            cumulative.append((bound, running))
+        return {
+            'calls': self.count,
+            'errors': self.errors,
+            'total_ms': round(self.sum * 1000, 3),
+            'mean_ms': round(self.sum * 1000 / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(self.quantile(0.5) * 1000, 3),
+            'p95_ms': round(self.quantile(0.95) * 1000, 3),
+            'p99_ms': round(self.quantile(0.99) * 1000, 3),
+            'buckets': {str(bound): count for bound, count in cumulative}
+        }
+
+
+class HistogramFamily:
+    """Histograms of one measurement, one per combination of label values"""
+
+    def __init__(self, name, labels, buckets=LATENCY_BUCKETS, help=''):
+        self.name = name
+        self.help = help or name.replace('_', ' ')
+        self.labels = tuple(labels)
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, seconds, error=False):
+        with self._lock:
+            histogram = self._histograms.get(label_values)
+            if histogram is None:
+                histogram = self._histograms[label_values] = Histogram(self.buckets)
+            histogram.observe(seconds, error)
+
+    def snapshot(self):
+        """Per-label summaries keyed 'value/value', slowest total time first"""
+        with self._lock:
+            items = [(label_values, histogram.snapshot()) for label_values, histogram in self._histograms.items()]
+        items.sort(key=lambda item: -item[1]['total_ms'])
+        return {'/'.join(label_values): summary for label_values, summary in items}
+
+    def prometheus(self):
+        """Prometheus text exposition: the histogram series plus an errors counter"""
+        with self._lock:
+            items = sorted((label_values, list(histogram.counts), histogram.count, histogram.sum, histogram.errors)
+                           for label_values, histogram in self._histograms.items())
+        # supabase_request_seconds -> supabase_request_errors_total
+        errors_name = self.name.replace('_seconds', '').replace('_duration', '') + '_errors_total'
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        error_lines = [f"# HELP {errors_name} Failed calls counted in {self.name}",
+                       f"# TYPE {errors_name} counter"]
+        for label_values, counts, count, total, errors in items:
+            labels = ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(self.labels, label_values))
+            running = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                running += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {running}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+            error_lines.append(f"{errors_name}{{{labels}}} {errors}")
+        return lines + error_lines
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(*families):
+    """Prometheus text format (version 0.0.4) for the given histogram families"""
+    return '\n'.join(line for family in families for line in family.prometheus()) + '\n'
+
+
+# Time spent in named steps of request handling, across all requests
+SPANS = HistogramFamily('span_duration_seconds', ('span',), help='Time spent in named steps of request handling')
+# (name, seconds) pairs recorded for the request being served, when one is recording
+current_spans = contextvars.ContextVar('current_spans', default=None)
+
+
+@contextmanager
+def span(name):
+    """Time a block (or, as a decorator, a function) into SPANS and the current request's spans.
+
+    Work handed to another thread is attributed to the request only when it
+    runs in a copy of the caller's context, as contextvars.copy_context().run.
+    """
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        SPANS.observe((name,), elapsed, error)
+        spans = current_spans.get()
+        if spans is not None:
+            spans.append((name, elapsed))
+
+
+def record_spans():
+    """Start collecting spans for this request; pass the token to finish_spans"""
+    return current_spans.set([])
+
+
+def finish_spans(token):
+    """Stop collecting and return the request's (name, seconds) spans"""
+    spans = current_spans.get() or []
+    current_spans.reset(token)
+    return spans
+
+
+def server_timing(spans):
+    """Server-Timing header value, one entry per span name with durations summed"""
+    totals = {}
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    # Server-Timing names are tokens, so '/' and '.' become '-'
+    return ', '.join(f'{name.replace("/", "-").replace(".", "-")};dur={total * 1000:.2f}'
+                     for name, total in totals.items())
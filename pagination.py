@@ -0,0 +1,95 @@
+import base64
+import json
+from collections import namedtuple
+from urllib.parse import urlencode
+
+from postgrest.utils import sanitize_param
+
+# limit: rows per page; after: key values of the last row already seen;
+# fields: columns to return, or None for all of them
+PageRequest = namedtuple('PageRequest', ['limit', 'after', 'fields'])
+
+
+class PageError(ValueError):
+    """A limit, after or fields argument the endpoint cannot honour"""
+
+
+def encode_cursor(values):
+    """Opaque cursor for the sort key values of a page's last row"""
+    return base64.urlsafe_b64encode(json.dumps(list(values), separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise PageError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise PageError('Invalid cursor')
+    return tuple(values)
+
+
+def page_limit(args, default_limit, max_limit):
+    """Rows per page for ?limit=, default_limit when absent, capped at max_limit"""
+    try:
+        limit = int(args.get('limit', default_limit))
+    except (TypeError, ValueError):
+        raise PageError('limit must be a number')
+    if limit < 1:
+        raise PageError('limit must be at least 1')
+    return min(limit, max_limit)
+
+
+def page_request(args, keys, columns, default_limit, max_limit):
+    """Read limit, after and fields from query args, validating fields against the table's columns"""
+    limit = page_limit(args, default_limit, max_limit)
+
+    after = args.get('after')
+    after = decode_cursor(after, len(keys)) if after else None
+
+    fields = None
+    if args.get('fields'):
+        fields = tuple(dict.fromkeys(field.strip() for field in args['fields'].split(',') if field.strip()))
+        unknown = [field for field in fields if field not in columns]
+        if unknown:
+            raise PageError(f"Unknown fields: {', '.join(unknown)}")
+    return PageRequest(limit, after, fields)
+
+
+def keyset_condition(keys, values):
+    """PostgREST or= filter for rows sorting after values on (keys...)"""
+    clauses = []
+    for i, key in enumerate(keys):
+        parts = [f"{k}.eq.{sanitize_param(v)}" for k, v in zip(keys[:i], values[:i])]
+        parts.append(f"{key}.gt.{sanitize_param(values[i])}")
+        clauses.append(parts[0] if len(parts) == 1 else f"and({','.join(parts)})")
+    return ','.join(clauses)
+
+
+def select_columns(page, keys):
+    """Columns to select: the requested fields plus the sort keys the cursor needs"""
+    if page.fields is None:
+        return '*'
+    return ','.join(dict.fromkeys(page.fields + tuple(keys)))
+
+
+def page_rows(rows, page, keys):
+    """Return (rows for this page, cursor for the next page or None)"""
+    rows = rows or []
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        next_cursor = encode_cursor(rows[-1][key] for key in keys)
+    if page.fields is not None:
+        rows = [{field: row.get(field) for field in page.fields} for row in rows]
+    return rows, next_cursor
+
+
+def next_page_headers(base_url, args, next_cursor, limit):
+    """X-Page-Limit on every page, so a client that sent no limit sees it got one page,
+    plus X-Next-Cursor and a Link rel=next while rows remain, for endpoints whose body is a bare list"""
+    headers = {'X-Page-Limit': str(limit)}
+    if next_cursor:
+        args = dict(args, after=next_cursor)
+        headers.update({'X-Next-Cursor': next_cursor, 'Link': f'<{base_url}?{urlencode(args)}>; rel="next"'})
+    return headers
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import threading
+import time
+
+from pagination import keyset_condition
+
+# Newest-first preference for the column incremental pulls follow
+CHANGE_COLUMNS = ('updated_at', 'created_at')
+
+
+class ReadReplica:
+    """Local copy of Supabase tables for the read paths to query.
+
+    The copy lives in a local storage engine: a SQLite file, or memory when
+    the worker should not touch disk. A background thread keeps it current.
+    Each pass pulls only rows whose updated_at (or created_at, when a table
+    has no updated_at) is past the newest row already copied. Every
+    full_sync_interval, and whenever a write through this worker marks a
+    table stale, the whole table is read again instead; that is what picks
+    up updates and deletes on tables that only have created_at.
+
+    A table is served locally once it has been synced and while no local
+    write is waiting to be copied, so reads keep working when Supabase is
+    slow or down. Sync progress is saved with the rows, so a restarted
+    worker with a SQLite copy serves it straight away.
+    """
+
+    def __init__(self, client, local, interval=5, full_sync_interval=300, batch_size=1000, on_change=None):
+        self.client = client
+        # A storage.LocalStorage holding every table to copy
+        self.local = local
+        self.tables = local.tables
+        self.interval = interval
+        self.full_sync_interval = full_sync_interval
+        self.batch_size = batch_size
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        # Local writes per table, and how many of them the last full sync has seen
+        self._writes = {table: 0 for table in self.tables}
+        self._synced_writes = {table: 0 for table in self.tables}
+        self.state = {table: {
+            'change_column': None,
+            'watermark': None,
+            'digest': None,
+            'synced_at': None,
+            'last_full_sync': None,
+            'full_syncs': 0,
+            'incremental_pulls': 0,
+            'rows_pulled': 0,
+            'error': None
+        } for table in self.tables}
+
+        for table, saved in local.load_sync_state().items():
+            if table in self.state:
+                self.state[table].update(saved)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='replica-sync', daemon=True)
+                self._thread.start()
+
+    def mark_stale(self, table):
+        """Note a write through this worker; reads go to Supabase until it has been copied"""
+        if table not in self.tables:
+            return
+        with self._lock:
+            self._writes[table] += 1
+        self._wake.set()
+
+    def serves(self, table):
+        """Whether reads of the table can be answered locally"""
+        if table not in self.tables:
+            return False
+        with self._lock:
+            fresh = self._writes[table] == self._synced_writes[table]
+        return fresh and self.state[table]['synced_at'] is not None
+
+    def sync(self):
+        """Bring every table up to date once"""
+        for table in self.tables:
+            state = self.state[table]
+            with self._lock:
+                stale = self._writes[table] != self._synced_writes[table]
+            full = (stale or state['last_full_sync'] is None or not state['change_column']
+                    or time.monotonic() - state['last_full_sync'] >= self.full_sync_interval)
+            try:
+                changed = self._full_sync(table) if full else self._pull_changes(table)
+                state['error'] = None
+            except Exception as e:
+                print(f"Error syncing replica table {table}: {e}")
+                state['error'] = str(e)
+                continue
+            if changed and self.on_change:
+                self.on_change(table)
+
+    def _run(self):
+        while True:
+            self.sync()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _fetch(self, table, order, after=None):
+        """Page through a Supabase table on the keyset order, starting past after"""
+        rows = []
+        while True:
+            query = self.client.table(table).select('*')
+            if after:
+                query = query.or_(keyset_condition(order, after))
+            page = query.order(','.join(order)).limit(self.batch_size).execute().data or []
+            rows.extend(page)
+            if len(page) < self.batch_size:
+                return rows
+            after = [page[-1][column] for column in order]
+
+    def _store(self, table, rows, replace):
+        state = self.state[table]
+        sync_state = {name: state[name] for name in ('change_column', 'watermark', 'digest', 'synced_at')}
+        if replace:
+            self.local.replace(table, rows, sync_state)
+        else:
+            self.local.upsert(table, rows, sync_state)
+
+    def _advance(self, table, rows):
+        """Move the watermark to the newest row by (change column, key)"""
+        state = self.state[table]
+        column, key = state['change_column'], self.local.key(table)
+        positions = [[row[column], row[key]] for row in rows if column and row.get(column) is not None]
+        if positions:
+            newest = max(positions)
+            if state['watermark'] is None or newest > state['watermark']:
+                state['watermark'] = newest
+
+    def _full_sync(self, table):
+        """Replace the local copy with the whole table; returns whether its content changed"""
+        with self._lock:
+            writes = self._writes[table]
+        key = self.local.key(table)
+        rows = self._fetch(table, (key,))
+
+        state = self.state[table]
+        if rows:
+            state['change_column'] = next((column for column in CHANGE_COLUMNS if column in rows[0]), None)
+        elif not state['change_column']:
+            state['change_column'] = 'created_at'
+        state['watermark'] = None
+        self._advance(table, rows)
+        digest = hashlib.sha1(json.dumps(rows, sort_keys=True, default=str).encode()).hexdigest()
+        changed = digest != state['digest']
+        state['digest'] = digest
+        state['synced_at'] = time.time()
+        self._store(table, rows, replace=True)
+
+        state['last_full_sync'] = time.monotonic()
+        state['full_syncs'] += 1
+        state['rows_pulled'] += len(rows)
+        with self._lock:
+            # Writes made while the table was being read may be missing from it
+            self._synced_writes[table] = writes
+        return changed
+
+    def _pull_changes(self, table):
+        """Copy rows changed since the watermark; returns whether there were any"""
+        state = self.state[table]
+        order = (state['change_column'], self.local.key(table))
+        rows = self._fetch(table, order, state['watermark'])
+        state['incremental_pulls'] += 1
+        state['synced_at'] = time.time()
+        if rows:
+            state['rows_pulled'] += len(rows)
+            # The next full sync recomputes it from the whole table
+            state['digest'] = None
+            self._advance(table, rows)
+        self._store(table, rows, replace=False)
+        return bool(rows)
+
+    def stats(self):
+        now = time.time()
+        tables = {}
+        for table, state in self.state.items():
+            tables[table] = {
+                'serving': self.serves(table),
+                'rows': self.local.count(table),
+                'change_column': state['change_column'],
+                'lag_seconds': round(now - state['synced_at'], 3) if state['synced_at'] else None,
+                'full_syncs': state['full_syncs'],
+                'incremental_pulls': state['incremental_pulls'],
+                'rows_pulled': state['rows_pulled'],
+                'error': state['error']
+            }
+        return {
+            'engine': self.local.name,
+            'path': getattr(self.local, 'path', None),
+            'interval': self.interval,
+            'full_sync_interval': self.full_sync_interval,
+            'tables': tables
+        }
@@ -0,0 +1,307 @@
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+WEEKDAYS = ['MON', 'TUE', 'WED', 'THU', 'FRI']
+DAY_ORDINALS = {day: i for i, day in enumerate(WEEKDAYS)}
+
+# Spoken or abbreviated names mapped to the subject names used in the timetable
+SUBJECT_ALIASES = {
+    'PPL': 'PRINCIPLES OF PL',
+    'PRINCIPLES': 'PRINCIPLES OF PL',
+    'PRINCIPLES OF PROGRAMMING LANGUAGES': 'PRINCIPLES OF PL',
+    'SOFTWARE': 'SOFTWARE ENGG',
+    'SOFTWARE ENGINEERING': 'SOFTWARE ENGG',
+    'DISTRIBUTED': 'DISTRIBUTED SYSTEMS',
+    'DS': 'DISTRIBUTED SYSTEMS',
+    'SECURITY': 'COMPUTER SECURITY',
+    'COMPUTER SEC': 'COMPUTER SECURITY',
+    'CLOUD COMPUTING': 'CLOUD',
+    'FULLSTACK': 'FULL STACK',
+    'FULL STACK DEVELOPMENT': 'FULL STACK',
+    'WIRELESS NETWORKS': 'WIRELESS'
+}
+
+# Candidates scoring within this margin of the best one make a match ambiguous
+AMBIGUITY_MARGIN = 0.1
+MIN_FUZZY_SCORE = 0.3
+
+
+CLOCK_PATTERN = re.compile(r'\s*(\d{1,2}):(\d{2})(?::\d{2}(?:\.\d+)?)?\s*(?:([ap])\.?m\.?)?\s*', re.IGNORECASE)
+
+
+def parse_clock(time_str, afternoon=True):
+    """Minutes since midnight for a timetable time; raises ValueError if it is not one.
+
+    Takes '9:50', '13:20', '09:50:00' and '1:20 PM'. The timetable omits AM/PM,
+    and classes run roughly 9 to 5, so an unmarked, unpadded 1:00-6:59 is
+    afternoon unless afternoon is False. Zero-padded times such as '06:00'
+    are 24-hour.
+    """
+    match = CLOCK_PATTERN.fullmatch(str(time_str or ''))
+    if not match:
+        raise ValueError(f"Not a clock time: {time_str!r}")
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    if minutes > 59 or hours > (12 if meridiem else 23) or (meridiem and hours == 0):
+        raise ValueError(f"Not a clock time: {time_str!r}")
+    if meridiem:
+        return (hours % 12 + (12 if meridiem.lower() == 'p' else 0)) * 60 + minutes
+    if afternoon and len(match.group(1)) == 1 and 1 <= hours < 7:
+        hours += 12
+    return hours * 60 + minutes
+
+
+def clock_minutes(time_str):
+    """parse_clock for stored rows, where an unreadable time counts as midnight"""
+    try:
+        return parse_clock(time_str)
+    except ValueError:
+        return 0
+
+
+def class_span(start_time, end_time):
+    """(start, end) minutes of a class; raises ValueError unless both parse and it ends after it starts"""
+    start, end = parse_clock(start_time), parse_clock(end_time)
+    if end <= start:
+        # An early unmarked start that ends in the morning, e.g. 6:30-7:30, was morning after all
+        start = parse_clock(start_time, afternoon=False)
+    if end <= start:
+        raise ValueError(f"Ends at {end_time} before it starts at {start_time}")
+    return start, end
+
+
+def row_span(row):
+    """class_span of a stored row; unreadable times count as midnight and the end is never before the start"""
+    try:
+        return class_span(row.get('start_time'), row.get('end_time'))
+    except ValueError:
+        start, end = clock_minutes(row.get('start_time')), clock_minutes(row.get('end_time'))
+        return start, max(start, end)
+
+
+def minute_of_day(moment):
+    """Minutes since midnight of a datetime, on the same scale as parse_clock"""
+    return moment.hour * 60 + moment.minute
+
+
+def timetable_problems(rows):
+    """What is wrong with a timetable's times, one message per problem, for checking fixtures and imports.
+
+    rows are dicts or (day, period, start_time, end_time, ...) tuples as in
+    database.TIMETABLE_ENTRIES. Each day's classes must parse, end after
+    they start, not overlap and run in period order.
+    """
+    by_day = {}
+    problems = []
+    for row in rows:
+        if not isinstance(row, dict):
+            row = dict(zip(('day', 'period', 'start_time', 'end_time'), row))
+        label = f"{row.get('day')} period {row.get('period')}"
+        try:
+            start, end = class_span(row.get('start_time'), row.get('end_time'))
+        except ValueError as e:
+            problems.append(f"{label}: {e}")
+            continue
+        by_day.setdefault(row.get('day'), []).append((row.get('period'), start, end, label))
+    for day, classes in by_day.items():
+        classes.sort()
+        for (_, start, end, label), (_, next_start, _, next_label) in zip(classes, classes[1:]):
+            if next_start < end:
+                problems.append(f"{next_label} starts before {label} ends")
+    return problems
+
+
+def normalize_subject(text):
+    """Reduce a subject name to comparable tokens ("p p l" -> PPL, SYSTEMS -> SYSTEM)"""
+    tokens = []
+    letters = ''
+    for token in re.findall(r'[A-Z0-9]+', text.upper()):
+        # Transcripts spell acronyms out letter by letter
+        if len(token) == 1 and token.isalpha():
+            letters += token
+            continue
+        if letters:
+            tokens.append(letters)
+            letters = ''
+        tokens.append(token)
+    if letters:
+        tokens.append(letters)
+    return tuple(token[:-1] if len(token) > 3 and token.endswith('S') and not token.endswith('SS') else token
+                 for token in tokens)
+
+
+def trigrams(key):
+    """Character trigrams of a normalized key, padded so short names still match"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SubjectIndex:
+    """Resolves spoken subject names to timetable subjects via aliases, tokens and trigrams"""
+
+    def __init__(self, rows):
+        self.rows = {}
+        for row in rows:
+            self.rows.setdefault(row['subject'], []).append(row)
+        self.names = {}
+        for subject in self.rows:
+            self.names[' '.join(normalize_subject(subject))] = subject
+        for alias, subject in SUBJECT_ALIASES.items():
+            if subject in self.rows:
+                self.names.setdefault(' '.join(normalize_subject(alias)), subject)
+
+        self.by_token = {}
+        self.token_counts = {}
+        for subject in self.rows:
+            tokens = normalize_subject(subject)
+            self.token_counts[subject] = len(tokens)
+            for token in tokens:
+                self.by_token.setdefault(token, set()).add(subject)
+        self.by_trigram = {}
+        self.name_trigrams = {}
+        for name in self.names:
+            self.name_trigrams[name] = trigrams(name)
+            for gram in self.name_trigrams[name]:
+                self.by_trigram.setdefault(gram, set()).add(name)
+
+    def candidates(self, spoken, limit=3):
+        """Return up to limit (subject, score) pairs, best first"""
+        tokens = normalize_subject(spoken)
+        key = ' '.join(tokens)
+        if not key:
+            return []
+        if key in self.names:
+            return [(self.names[key], 1.0)]
+
+        # Every spoken token appears in the subject ("distributed" -> DISTRIBUTED SYSTEMS)
+        matches = None
+        for token in tokens:
+            subjects = self.by_token.get(token, set())
+            matches = subjects if matches is None else matches & subjects
+            if not matches:
+                break
+        if matches:
+            ranked = sorted(((subject, len(tokens) / self.token_counts[subject]) for subject in matches),
+                            key=lambda pair: (-pair[1], pair[0]))
+            return [(subject, round(0.5 + score / 2, 3)) for subject, score in ranked[:limit]]
+
+        # Fall back to trigram similarity against names sharing at least one trigram
+        grams = trigrams(key)
+        shared = {}
+        for gram in grams:
+            for name in self.by_trigram.get(gram, ()):
+                shared[name] = shared.get(name, 0) + 1
+        scores = {}
+        for name, count in shared.items():
+            score = count / (len(grams) + len(self.name_trigrams[name]) - count)
+            subject = self.names[name]
+            if score >= MIN_FUZZY_SCORE and score > scores.get(subject, 0):
+                scores[subject] = score
+        ranked = sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))
+        return [(subject, round(score, 3)) for subject, score in ranked[:limit]]
+
+    def best(self, spoken):
+        """Return (subject, candidates); subject is None when nothing or several things match"""
+        candidates = self.candidates(spoken)
+        if not candidates:
+            return None, []
+        if len(candidates) > 1 and candidates[1][1] >= candidates[0][1] - AMBIGUITY_MARGIN:
+            return None, candidates
+        return candidates[0][0], candidates
+
+    def rows_for(self, subject):
+        """Return a subject's rows in weekday and period order"""
+        return self.rows.get(subject, [])
+
+
+class ClassTable:
+    """Timetable rows with their times parsed once into parallel arrays.
+
+    Rows are ordered by weekday, start time and period; days, periods, starts
+    and ends hold the day ordinal, period and start/end minutes of each row,
+    and bounds the [lo, hi) range of each weekday's rows. by_period holds
+    each day's row positions reordered by period, and sorted_periods their
+    periods, so a period can be bisected within the same bounds. Rows for
+    days outside WEEKDAYS are left out.
+    """
+
+    __slots__ = ('rows', 'days', 'periods', 'starts', 'ends', 'bounds', 'by_period', 'sorted_periods')
+
+    def __init__(self, rows):
+        keyed = []
+        for row in rows:
+            day = DAY_ORDINALS.get(row.get('day'))
+            if day is not None:
+                start, end = row_span(row)
+                keyed.append((day, start, int(row['period']), end, row))
+        keyed.sort(key=lambda entry: entry[:3])
+        self.rows = tuple(entry[4] for entry in keyed)
+        self.days = array('b', (entry[0] for entry in keyed))
+        self.starts = array('i', (entry[1] for entry in keyed))
+        self.periods = array('i', (entry[2] for entry in keyed))
+        self.ends = array('i', (entry[3] for entry in keyed))
+        self.bounds = tuple((bisect_left(self.days, day), bisect_right(self.days, day))
+                            for day in range(len(WEEKDAYS)))
+        self.by_period = array('i', sorted(range(len(keyed)), key=lambda i: (self.days[i], self.periods[i], i)))
+        self.sorted_periods = array('i', (self.periods[i] for i in self.by_period))
+
+    def day_range(self, day):
+        """(lo, hi) of a weekday's rows, empty for other days"""
+        ordinal = DAY_ORDINALS.get(day)
+        return self.bounds[ordinal] if ordinal is not None else (0, 0)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class WeekIndex:
+    """Sorted per-day view of a timetable snapshot answering time lookups by bisection"""
+
+    def __init__(self, rows):
+        self.table = ClassTable(rows)
+        self.subjects = SubjectIndex(self.table.rows)
+
+    def classes_on(self, day):
+        """Return the day's rows in time order"""
+        lo, hi = self.table.day_range(day)
+        return list(self.table.rows[lo:hi])
+
+    def current(self, day, minutes):
+        """Return the class running at the given minute of the day, if any"""
+        lo, hi = self.table.day_range(day)
+        i = bisect_right(self.table.starts, minutes, lo, hi) - 1
+        if i >= lo and minutes <= self.table.ends[i]:
+            return self.table.rows[i]
+        return None
+
+    def next_today(self, day, minutes):
+        """Return the first class on the day starting after the given minute"""
+        lo, hi = self.table.day_range(day)
+        i = bisect_right(self.table.starts, minutes, lo, hi)
+        if i < hi:
+            return self.table.rows[i]
+        return None
+
+    def first_after_day(self, day):
+        """Return (day, row) for the first class on a later weekday this week"""
+        start = DAY_ORDINALS[day] + 1 if day in DAY_ORDINALS else 0
+        for next_day in WEEKDAYS[start:]:
+            lo, hi = self.table.day_range(next_day)
+            if lo < hi:
+                return next_day, self.table.rows[lo]
+        return None, None
+
+    def next_class(self, day, minutes):
+        """Return (day, row) for the next class from a moment, rolling over to later days"""
+        row = self.next_today(day, minutes)
+        if row is not None:
+            return day, row
+        return self.first_after_day(day)
+
+    def after_period(self, day, period):
+        """Return the class following a period on the same day, or None"""
+        lo, hi = self.table.day_range(day)
+        i = bisect_left(self.table.sorted_periods, period, lo, hi)
+        if i + 1 < hi and self.table.sorted_periods[i] == period:
+            return self.table.rows[self.table.by_period[i + 1]]
+        return None
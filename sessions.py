@@ -0,0 +1,172 @@
+import json
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Client-chosen ids are accepted as long as they look like one of ours
+SESSION_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{16,64}')
+
+
+def new_session_id():
+    return secrets.token_urlsafe(16)
+
+
+def valid_session_id(session_id):
+    return bool(session_id) and SESSION_ID_PATTERN.fullmatch(session_id) is not None
+
+
+class ConversationContext:
+    """What the schedule handlers remember between one student's turns"""
+
+    __slots__ = ('last_class', 'last_query_type', 'last_day', 'greeting_done', 'touched')
+
+    # Everything but touched, which the store keeps for idle expiry
+    FIELDS = ('last_class', 'last_query_type', 'last_day', 'greeting_done')
+
+    def __init__(self, last_class=None, last_query_type=None, last_day=None, greeting_done=False, touched=0.0):
+        self.last_class = last_class
+        self.last_query_type = last_query_type
+        self.last_day = last_day
+        self.greeting_done = greeting_done
+        self.touched = touched
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+class SessionStore:
+    """Conversation contexts by session id, LRU-bounded by count and idle time.
+
+    Contexts idle for idle_ttl seconds are dropped. When more than maxsize
+    are held, the least recently used are spilled to a SQLite file if
+    spill_path is set, or dropped otherwise; a spilled context is read back
+    on its student's next turn, as long as it has not been idle too long.
+    """
+
+    def __init__(self, maxsize=50000, idle_ttl=1800, spill_path=None):
+        self.maxsize = maxsize
+        self.idle_ttl = idle_ttl
+        self.spill_path = spill_path
+        # Least recently used first, which is also oldest touched first
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.spills = 0
+        self.restores = 0
+        if spill_path:
+            with self.connection() as conn:
+                conn.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    context TEXT NOT NULL,
+                    touched REAL NOT NULL
+                )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS sessions_touched ON sessions (touched)')
+
+    def connection(self):
+        """This thread's connection to the spill file"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.spill_path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id):
+        """The session's context, restored from the spill or started afresh when it has none"""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            context = self._data.get(session_id)
+            if context is not None:
+                self._data.move_to_end(session_id)
+                context.touched = now
+                self.hits += 1
+                return context
+
+        context = self._restore(session_id, now)
+        with self._lock:
+            # Another request of the same student may have got here first
+            existing = self._data.get(session_id)
+            if existing is not None:
+                self._data.move_to_end(session_id)
+                existing.touched = now
+                self.hits += 1
+                return existing
+            if context is None:
+                context = ConversationContext()
+                self.misses += 1
+            else:
+                self.restores += 1
+                self.hits += 1
+            context.touched = now
+            self._data[session_id] = context
+            overflow = []
+            while len(self._data) > self.maxsize:
+                overflow.append(self._data.popitem(last=False))
+        if overflow:
+            self._spill(overflow)
+        return context
+
+    def _expire(self, now):
+        # Oldest touched first, so the scan stops at the first live context
+        cutoff = now - self.idle_ttl
+        while self._data:
+            session_id, context = next(iter(self._data.items()))
+            if context.touched > cutoff:
+                break
+            del self._data[session_id]
+            self.expirations += 1
+
+    def _spill(self, entries):
+        if not self.spill_path:
+            return
+        rows = [(session_id, json.dumps(context.to_dict()), context.touched) for session_id, context in entries]
+        with self.connection() as conn:
+            conn.executemany('INSERT OR REPLACE INTO sessions (session_id, context, touched) VALUES (?, ?, ?)', rows)
+            conn.execute('DELETE FROM sessions WHERE touched <= ?', (time.time() - self.idle_ttl,))
+        with self._lock:
+            self.spills += len(rows)
+
+    def _restore(self, session_id, now):
+        if not self.spill_path:
+            return None
+        with self.connection() as conn:
+            row = conn.execute('SELECT context, touched FROM sessions WHERE session_id = ?', (session_id,)).fetchone()
+            if row is None:
+                return None
+            # Back in memory now; the spill only ever holds evicted contexts
+            conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+        context, touched = row
+        if touched <= now - self.idle_ttl:
+            return None
+        return ConversationContext(**json.loads(context))
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'idle_ttl': self.idle_ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'expirations': self.expirations,
+                'spills': self.spills,
+                'restores': self.restores
+            }
+        if self.spill_path:
+            stats['spilled'] = self.connection().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        return stats
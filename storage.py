@@ -0,0 +1,515 @@
+import inspect
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from database import TABLE_LAYOUTS, create_replica_state_table, create_storage_table
+from pagination import keyset_condition
+
+ENGINES = ('supabase', 'sqlite', 'memory')
+
+
+class DuplicateKeyError(ValueError):
+    """An insert whose primary key is already taken"""
+
+
+class Storage:
+    """The reads and writes the routes make, independent of where the tables live.
+
+    select() takes where as {column: value}, where a list, tuple or set
+    value matches any of its items and None matches NULL; order names the
+    sort columns and after keeps rows sorting past those values, as a keyset
+    page. Writes return the rows they touched, as Supabase does.
+    """
+
+    name = None
+    # Whether calls leave the process, i.e. are worth caching and counting
+    remote = False
+
+    def select(self, table, where=None, order=None, after=None, columns=None, limit=None):
+        raise NotImplementedError
+
+    def insert(self, table, rows):
+        """Insert a row or a list of rows; returns the stored rows"""
+        raise NotImplementedError
+
+    def update(self, table, where, changes):
+        raise NotImplementedError
+
+    def delete(self, table, where):
+        raise NotImplementedError
+
+    def user_role(self, user_id):
+        """The user's role in user_roles, or None"""
+        rows = self.select('user_roles', where={'user_id': user_id}, columns=('role',), limit=1)
+        return rows[0]['role'] if rows else None
+
+    def stats(self):
+        return {'engine': self.name}
+
+
+class SupabaseStorage(Storage):
+    """Tables in Supabase, reached through a SupabaseClient.
+
+    With an asynchronous client every method returns an awaitable instead.
+    """
+
+    name = 'supabase'
+    remote = True
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _filtered(query, where):
+        for column, value in (where or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                query = query.in_(column, list(value))
+            elif value is None:
+                query = query.is_(column, 'null')
+            else:
+                query = query.eq(column, value)
+        return query
+
+    @staticmethod
+    def _rows(query, shape=None):
+        result = query.execute()
+        if inspect.isawaitable(result):
+            return SupabaseStorage._await_rows(result, shape)
+        rows = result.data or []
+        return shape(rows) if shape else rows
+
+    @staticmethod
+    async def _await_rows(result, shape):
+        rows = (await result).data or []
+        return shape(rows) if shape else rows
+
+    def select(self, table, where=None, order=None, after=None, columns=None, limit=None):
+        query = self._filtered(self.client.table(table).select(', '.join(columns) if columns else '*'), where)
+        if after:
+            query = query.or_(keyset_condition(order, after))
+        if order:
+            # One order= param; PostgREST does not reliably combine repeated ones
+            query = query.order(','.join(order))
+        if limit is not None:
+            query = query.limit(limit)
+        return self._rows(query)
+
+    def insert(self, table, rows):
+        return self._rows(self.client.table(table).insert(rows))
+
+    def update(self, table, where, changes):
+        return self._rows(self._filtered(self.client.table(table).update(changes), where))
+
+    def delete(self, table, where):
+        return self._rows(self._filtered(self.client.table(table).delete(), where))
+
+    def user_role(self, user_id):
+        query = self.client.table('user_roles').select('role').eq('user_id', user_id).limit(1)
+        return self._rows(query, lambda rows: rows[0]['role'] if rows else None)
+
+
+class LocalStorage(Storage):
+    """Tables held by this process, each with a layout from database.TABLE_LAYOUTS.
+
+    Local engines can also be bulk loaded, which the read replica and seeding
+    use: replace() and upsert() take rows as Supabase returns them, and an
+    optional sync_state that is saved together with them.
+    """
+
+    def __init__(self, tables):
+        # table name -> layout name in database.TABLE_LAYOUTS
+        self.tables = dict(tables)
+
+    def key(self, table):
+        return TABLE_LAYOUTS[self.tables[table]][0]
+
+    def columns(self, table):
+        return TABLE_LAYOUTS[self.tables[table]][1]
+
+    def lookups(self, table):
+        return TABLE_LAYOUTS[self.tables[table]][2]
+
+    def integers(self, table):
+        return TABLE_LAYOUTS[self.tables[table]][3]
+
+    def coerce(self, table, row):
+        """A copy of row with integer columns sent as text ("7") read as numbers, as SQLite and Postgres store them"""
+        row = dict(row)
+        for column in self.integers(table):
+            if column not in row:
+                continue
+            value = row[column]
+            if isinstance(value, (list, tuple, set)):
+                row[column] = type(value)(coerce_integer(item) for item in value)
+            else:
+                row[column] = coerce_integer(value)
+        return row
+
+    def check_columns(self, table, names):
+        if table not in self.tables:
+            raise ValueError(f"Unknown table: {table}")
+        known = self.columns(table)
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            raise ValueError(f"Unknown {table} columns: {', '.join(unknown)}")
+
+    def new_row(self, table, row):
+        """A row as it will be stored, with created_at filled in as Supabase would"""
+        self.check_columns(table, row)
+        row = self.coerce(table, row)
+        if 'created_at' in self.columns(table) and row.get('created_at') is None:
+            row['created_at'] = datetime.now(timezone.utc).isoformat()
+        return row
+
+    def replace(self, table, rows, sync_state=None):
+        raise NotImplementedError
+
+    def upsert(self, table, rows, sync_state=None):
+        raise NotImplementedError
+
+    def count(self, table):
+        raise NotImplementedError
+
+    def load_sync_state(self):
+        """Sync progress saved with earlier loads, by table"""
+        raise NotImplementedError
+
+    def seed(self, tables):
+        """Load {table: rows} into the tables that are still empty; returns the tables loaded"""
+        loaded = []
+        for table, rows in tables.items():
+            if table in self.tables and not self.count(table):
+                self.replace(table, rows)
+                loaded.append(table)
+        return loaded
+
+    def stats(self):
+        return {'engine': self.name, 'rows': {table: self.count(table) for table in self.tables}}
+
+
+class SQLiteStorage(LocalStorage):
+    """Tables in a SQLite file, created with the layouts and indexes in database.py"""
+
+    name = 'sqlite'
+
+    def __init__(self, path, tables):
+        super().__init__(tables)
+        self.path = path
+        self._local = threading.local()
+        conn = self.connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        with conn:
+            create_replica_state_table(conn)
+            for table, layout in self.tables.items():
+                create_storage_table(conn, table, layout)
+
+    def connection(self):
+        """This thread's connection to the file"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _where(where):
+        clauses, params = [], []
+        for column, value in (where or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                clauses.append(f"{column} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            elif value is None:
+                clauses.append(f"{column} IS NULL")
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return clauses, params
+
+    def select(self, table, where=None, order=None, after=None, columns=None, limit=None):
+        known = self.columns(table)
+        self.check_columns(table, list(columns or ()) + list(where or ()) + list(order or ()))
+
+        sql = f"SELECT {', '.join(columns or known)} FROM {table}"
+        clauses, params = self._where(where)
+        if after:
+            clauses.append(f"({', '.join(order)}) > ({', '.join('?' * len(after))})")
+            params.extend(after)
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        if order:
+            sql += ' ORDER BY ' + ', '.join(order)
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [dict(row) for row in self.connection().execute(sql, params)]
+
+    def _keys(self, conn, table, where):
+        key = self.key(table)
+        clauses, params = self._where(where)
+        sql = f"SELECT {key} FROM {table}" + (' WHERE ' + ' AND '.join(clauses) if clauses else '')
+        return [row[0] for row in conn.execute(sql, params)]
+
+    def _by_keys(self, conn, table, keys):
+        if not keys:
+            return []
+        placeholders = ', '.join('?' * len(keys))
+        rows = conn.execute(f"SELECT * FROM {table} WHERE {self.key(table)} IN ({placeholders})", keys)
+        by_key = {row[self.key(table)]: dict(row) for row in rows}
+        return [by_key[key] for key in keys if key in by_key]
+
+    def insert(self, table, rows):
+        key = self.key(table)
+        conn = self.connection()
+        keys = []
+        try:
+            with conn:
+                for row in rows if isinstance(rows, list) else [rows]:
+                    row = self.new_row(table, row)
+                    cursor = conn.execute(
+                        f"INSERT INTO {table} ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                        list(row.values())
+                    )
+                    keys.append(row[key] if row.get(key) is not None else cursor.lastrowid)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(f"Duplicate {table} {key}: {e}")
+        return self._by_keys(conn, table, keys)
+
+    def update(self, table, where, changes):
+        self.check_columns(table, list(where or ()) + list(changes))
+        key = self.key(table)
+        conn = self.connection()
+        with conn:
+            keys = self._keys(conn, table, where)
+            if keys and changes:
+                conn.execute(
+                    f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in changes)} "
+                    f"WHERE {key} IN ({', '.join('?' * len(keys))})",
+                    list(changes.values()) + keys
+                )
+        # A changed key is followed to its new value
+        if key in changes:
+            keys = [changes[key]] * bool(keys)
+        return self._by_keys(conn, table, keys)
+
+    def delete(self, table, where):
+        self.check_columns(table, where or ())
+        conn = self.connection()
+        with conn:
+            keys = self._keys(conn, table, where)
+            rows = self._by_keys(conn, table, keys)
+            if keys:
+                conn.execute(f"DELETE FROM {table} WHERE {self.key(table)} IN ({', '.join('?' * len(keys))})", keys)
+        return rows
+
+    def _load(self, table, rows, replace, sync_state):
+        columns = self.columns(table)
+        values = [tuple(row.get(column) for column in columns) for row in rows]
+        conn = self.connection()
+        with conn:
+            if replace:
+                conn.execute(f"DELETE FROM {table}")
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                values
+            )
+            if sync_state is not None:
+                conn.execute(
+                    'INSERT OR REPLACE INTO replica_state (table_name, change_column, watermark, digest, synced_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (table, sync_state['change_column'], json.dumps(sync_state['watermark']),
+                     sync_state['digest'], sync_state['synced_at'])
+                )
+
+    def replace(self, table, rows, sync_state=None):
+        self._load(table, rows, True, sync_state)
+
+    def upsert(self, table, rows, sync_state=None):
+        self._load(table, rows, False, sync_state)
+
+    def count(self, table):
+        return self.connection().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def load_sync_state(self):
+        return {row['table_name']: {
+            'change_column': row['change_column'],
+            'watermark': json.loads(row['watermark']) if row['watermark'] else None,
+            'digest': row['digest'],
+            'synced_at': row['synced_at']
+        } for row in self.connection().execute('SELECT * FROM replica_state')}
+
+    def stats(self):
+        return dict(super().stats(), path=self.path)
+
+
+def coerce_integer(value):
+    """An integer column value as a number when it is one written as text, otherwise unchanged"""
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            return value
+    return value
+
+
+def sort_value(value):
+    # NULLs sort last, as in PostgREST's ascending order, and a number stored
+    # as text (e.g. period "3" from a JSON body) sorts apart instead of raising
+    return (value is None, isinstance(value, str), value)
+
+
+class MemoryStorage(LocalStorage):
+    """Tables as dicts in this process: rows by primary key, plus a hash index per lookup column.
+
+    Nothing is persisted; a worker starts empty unless seeded or replicated into.
+    """
+
+    name = 'memory'
+
+    def __init__(self, tables):
+        super().__init__(tables)
+        self._lock = threading.RLock()
+        self._rows = {table: {} for table in self.tables}
+        # table -> column -> value -> keys of the rows holding it, in insertion order
+        self._indexes = {table: {column: {} for column in self.lookups(table)} for table in self.tables}
+        self._next_id = {table: 1 for table in self.tables}
+        self._sync_state = {}
+
+    def _add(self, table, row):
+        key = row[self.key(table)]
+        self._rows[table][key] = row
+        for column, index in self._indexes[table].items():
+            index.setdefault(row.get(column), {})[key] = None
+        if isinstance(key, int):
+            self._next_id[table] = max(self._next_id[table], key + 1)
+
+    def _remove(self, table, key):
+        row = self._rows[table].pop(key)
+        for column, index in self._indexes[table].items():
+            keys = index[row.get(column)]
+            del keys[key]
+            if not keys:
+                del index[row.get(column)]
+        return row
+
+    def _candidates(self, table, where):
+        """Keys worth testing against where, narrowed by the primary key or an index when it can be"""
+        key = self.key(table)
+        rows = self._rows[table]
+        for column, value in where.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            if column == key:
+                return [k for k in dict.fromkeys(values) if k in rows]
+            index = self._indexes[table].get(column)
+            if index is not None:
+                return [k for item in dict.fromkeys(values) for k in index.get(item, ())]
+        return list(rows)
+
+    def _matching(self, table, where):
+        where = self.coerce(table, where or {})
+        rows = self._rows[table]
+        matched = []
+        for key in self._candidates(table, where):
+            row = rows[key]
+            if all(row.get(column) in value if isinstance(value, (list, tuple, set)) else row.get(column) == value
+                   for column, value in where.items()):
+                matched.append(row)
+        return matched
+
+    def select(self, table, where=None, order=None, after=None, columns=None, limit=None):
+        self.check_columns(table, list(columns or ()) + list(where or ()) + list(order or ()))
+        with self._lock:
+            rows = self._matching(table, where)
+            if order:
+                rows = sorted(rows, key=lambda row: [sort_value(row.get(column)) for column in order])
+                if after:
+                    after = [sort_value(value) for value in after]
+                    rows = [row for row in rows if [sort_value(row.get(column)) for column in order] > after]
+            if limit is not None:
+                rows = rows[:limit]
+            if columns:
+                return [{column: row.get(column) for column in columns} for row in rows]
+            return [dict(row) for row in rows]
+
+    def insert(self, table, rows):
+        key = self.key(table)
+        with self._lock:
+            new_rows = []
+            for row in rows if isinstance(rows, list) else [rows]:
+                row = self.new_row(table, row)
+                if row.get(key) is None:
+                    row[key] = self._next_id[table]
+                if row[key] in self._rows[table] or any(row[key] == other[key] for other in new_rows):
+                    raise DuplicateKeyError(f"Duplicate {table} {key}: {row[key]}")
+                # Later rows of the batch take the ids after this one, as a sequence would
+                if isinstance(row[key], int):
+                    self._next_id[table] = max(self._next_id[table], row[key] + 1)
+                new_rows.append(dict(dict.fromkeys(self.columns(table)), **row))
+            for row in new_rows:
+                self._add(table, row)
+            return [dict(row) for row in new_rows]
+
+    def update(self, table, where, changes):
+        self.check_columns(table, list(where or ()) + list(changes))
+        key = self.key(table)
+        changes = self.coerce(table, changes)
+        with self._lock:
+            updated = []
+            for row in self._matching(table, where):
+                row = dict(self._remove(table, row[key]), **changes)
+                self._add(table, row)
+                updated.append(dict(row))
+            return updated
+
+    def delete(self, table, where):
+        self.check_columns(table, where or ())
+        key = self.key(table)
+        with self._lock:
+            return [self._remove(table, row[key]) for row in self._matching(table, where)]
+
+    def _load(self, table, rows, replace, sync_state):
+        columns = self.columns(table)
+        with self._lock:
+            if replace:
+                self._rows[table] = {}
+                self._indexes[table] = {column: {} for column in self.lookups(table)}
+            for row in rows:
+                row = self.coerce(table, {column: row.get(column) for column in columns})
+                if row[self.key(table)] in self._rows[table]:
+                    self._remove(table, row[self.key(table)])
+                self._add(table, row)
+            if sync_state is not None:
+                self._sync_state[table] = dict(sync_state)
+
+    def replace(self, table, rows, sync_state=None):
+        self._load(table, rows, True, sync_state)
+
+    def upsert(self, table, rows, sync_state=None):
+        self._load(table, rows, False, sync_state)
+
+    def count(self, table):
+        return len(self._rows[table])
+
+    def load_sync_state(self):
+        with self._lock:
+            return {table: dict(state) for table, state in self._sync_state.items()}
+
+
+def open_storage(engine, tables, client=None, path=None):
+    """The storage engine a deployment is configured with; tables maps names to TABLE_LAYOUTS"""
+    if engine == 'supabase':
+        return SupabaseStorage(client)
+    if engine == 'sqlite':
+        return SQLiteStorage(path, tables)
+    if engine == 'memory':
+        return MemoryStorage(tables)
+    raise ValueError(f"Unknown storage engine {engine!r}, expected one of: {', '.join(ENGINES)}")
+
+
+def load_seed(path):
+    """{table: rows} from a JSON file, e.g. an export of the Supabase tables"""
+    with open(path) as f:
+        return json.load(f)
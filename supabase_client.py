@@ -0,0 +1,163 @@
+import inspect
+import time
+
+import httpx
+from gotrue import AsyncGoTrueClient, SyncGoTrueClient
+from gotrue.http_clients import SyncClient as GoTrueSyncSession
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+from postgrest.utils import SyncClient as PostgrestSyncSession
+
+from metrics import HistogramFamily
+
+# Builder methods that decide what kind of request a query chain sends
+OPERATIONS = {'select', 'insert', 'update', 'upsert', 'delete'}
+
+
+def timed(latency, label_values, call, *args, **kwargs):
+    """Run a Supabase call, recording its latency; awaitable results are timed when awaited"""
+    started = time.perf_counter()
+    try:
+        result = call(*args, **kwargs)
+    except Exception:
+        latency.observe(label_values, time.perf_counter() - started, error=True)
+        raise
+    if inspect.isawaitable(result):
+        return _timed_await(latency, label_values, result, started)
+    latency.observe(label_values, time.perf_counter() - started)
+    return result
+
+
+async def _timed_await(latency, label_values, awaitable, started):
+    try:
+        result = await awaitable
+    except Exception:
+        latency.observe(label_values, time.perf_counter() - started, error=True)
+        raise
+    latency.observe(label_values, time.perf_counter() - started)
+    return result
+
+
+class TimedQuery:
+    """Wraps a postgrest request builder so execute() is timed under (table, operation)"""
+
+    __slots__ = ('_builder', '_table', '_operation', '_latency')
+
+    def __init__(self, builder, table, operation, latency):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+        self._latency = latency
+
+    def _wrap(self, result, operation):
+        if hasattr(result, 'execute'):
+            return TimedQuery(result, self._table, operation, self._latency)
+        return result
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        operation = name if name in OPERATIONS else self._operation
+        if not callable(attr):
+            # e.g. the not_ property, which returns the builder itself
+            return self._wrap(attr, operation)
+
+        def call(*args, **kwargs):
+            return self._wrap(attr(*args, **kwargs), operation)
+        return call
+
+    def or_(self, filters):
+        """PostgREST or=(...) filter, e.g. 'day.gt.MON,period.gt.3'; the pinned postgrest lacks or_()"""
+        if hasattr(self._builder, 'or_'):
+            return self._wrap(self._builder.or_(filters), self._operation)
+        self._builder.params = self._builder.params.add('or', f'({filters})')
+        return self
+
+    def execute(self):
+        return timed(self._latency, (self._table, self._operation or 'select'), self._builder.execute)
+
+
+class TimedAuth:
+    """Wraps the GoTrue client so each call is timed under ('auth', method)"""
+
+    def __init__(self, auth, latency):
+        self._auth = auth
+        self._latency = latency
+
+    def __getattr__(self, name):
+        attr = getattr(self._auth, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return timed(self._latency, ('auth', name), attr, *args, **kwargs)
+        return call
+
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """Sync PostgREST client whose session uses explicit connection pool limits"""
+
+    def __init__(self, base_url, limits, **kwargs):
+        # create_session runs inside the base constructor
+        self.limits = limits
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout):
+        return PostgrestSyncSession(base_url=base_url, headers=headers, timeout=timeout, limits=self.limits)
+
+
+class AsyncPooledPostgrestClient(AsyncPostgrestClient):
+    """Async PostgREST client whose session uses explicit connection pool limits"""
+
+    def __init__(self, base_url, limits, **kwargs):
+        self.limits = limits
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout):
+        return httpx.AsyncClient(base_url=base_url, headers=headers, timeout=timeout, limits=self.limits)
+
+
+class SupabaseClient:
+    """The table() and auth API of supabase.Client over pooled keep-alive connections.
+
+    Every query and auth call is timed into a histogram per (table, operation),
+    which stats() summarises. Pass asynchronous=True for awaitable calls, and
+    share one latency family between clients to report them together.
+    """
+
+    def __init__(self, url, key, timeout=10, pool_size=20, latency=None, asynchronous=False):
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        headers = {'apiKey': key, 'Authorization': f'Bearer {key}'}
+        self.asynchronous = asynchronous
+        self.latency = latency or HistogramFamily('supabase_request_seconds', ('table', 'operation'),
+                                                 help='Supabase call latency per table and operation')
+        if asynchronous:
+            self.postgrest = AsyncPooledPostgrestClient(f"{url}/rest/v1", limits, headers=headers, timeout=timeout)
+            auth_session = httpx.AsyncClient(timeout=timeout, limits=limits)
+            auth_class = AsyncGoTrueClient
+        else:
+            self.postgrest = PooledPostgrestClient(f"{url}/rest/v1", limits, headers=headers, timeout=timeout)
+            auth_session = GoTrueSyncSession(timeout=timeout, limits=limits)
+            auth_class = SyncGoTrueClient
+        # A server-side client never signs in, so there is no session to keep or refresh
+        self._auth = auth_class(url=f"{url}/auth/v1", headers=headers, persist_session=False,
+                                auto_refresh_token=False, http_client=auth_session)
+        self.auth = TimedAuth(self._auth, self.latency)
+
+    def table(self, name):
+        return TimedQuery(self.postgrest.from_(name), name, None, self.latency)
+
+    from_ = table
+
+    def stats(self):
+        """Latency and call counts per 'table/operation', slowest total time first"""
+        return self.latency.snapshot()
+
+    def close(self):
+        """Close the connection pools; awaitable for an asynchronous client"""
+        if self.asynchronous:
+            return self._aclose()
+        self.postgrest.aclose()
+        self._auth.close()
+
+    async def _aclose(self):
+        await self.postgrest.aclose()
+        await self._auth.close()
@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+import cache  # noqa: E402
+from supabase_stand_in import ADMIN_TOKEN, StandInSupabase, fixture_tables  # noqa: E402
+
+ADMIN_HEADERS = {'Authorization': f'Bearer {ADMIN_TOKEN}'}
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """The Flask app module on the memory engine, seeded with the fixture timetable.
+
+    Token checks go to a local Supabase stand-in; the model is never loaded.
+    app.py loads its models' libraries at import, so these tests need them installed.
+    """
+    pytest.importorskip('torch')
+    pytest.importorskip('transformers')
+    seed = tmp_path_factory.mktemp('seed') / 'tables.json'
+    seed.write_text(json.dumps(fixture_tables()))
+    os.environ.update({
+        'SUPABASE_URL': StandInSupabase().start(),
+        'MODEL_LOADING': 'lazy',
+        'STORAGE_ENGINE': 'memory',
+        'STORAGE_SEED': str(seed),
+        'REPLICA_PATH': ''
+    })
+    import app
+    return app
+
+
+@pytest.fixture
+def app(app_module):
+    """app_module with its tables back at the fixtures and its caches empty"""
+    tables = fixture_tables()
+    for table in app_module.storage.tables:
+        app_module.storage.replace(table, tables.get(table, []))
+        app_module.table_changed(table)
+    for cache in (app_module.admin_token_cache, app_module.response_cache, app_module.timetable_cache):
+        cache.invalidate()
+    return app_module
+
+
+@pytest.fixture
+def client(app):
+    return app.app.test_client()
+
+
+class Clock:
+    """Stands in for the time module in cache, with a monotonic clock the test moves"""
+
+    def __init__(self):
+        self.now = time.monotonic()
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Cache expiry time, moved forward by adding seconds to clock.now"""
+    clock = Clock()
+    monkeypatch.setattr(cache, 'time', clock)
+    return clock
@@ -0,0 +1,100 @@
+import base64
+import json
+import time
+
+import pytest
+
+
+def jwt(**claims):
+    """An unsigned JWT carrying claims; only the stubbed role check ever sees it"""
+    def part(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+    return f"{part({'alg': 'HS256'})}.{part(claims)}.signature"
+
+
+class RoleChecks:
+    """Stands in for check_admin_role: records each token checked and answers from verdicts, admin by default"""
+
+    def __init__(self):
+        self.tokens = []
+        self.verdicts = {}
+
+    def __call__(self, token):
+        self.tokens.append(token)
+        return self.verdicts.get(token, True)
+
+
+@pytest.fixture
+def checks(app, monkeypatch):
+    checks = RoleChecks()
+    monkeypatch.setattr(app, 'check_admin_role', checks)
+    return checks
+
+
+def verify(client, token):
+    return client.get('/admin/verify', headers={'Authorization': f'Bearer {token}'}).get_json()['is_admin']
+
+
+def test_verdict_is_reused_within_its_ttl(client, checks):
+    token = jwt(sub='admin')
+    assert verify(client, token) is True
+    assert verify(client, token) is True
+    assert checks.tokens == [token]
+
+
+def test_negative_verdict_is_cached_briefly(app, client, checks, clock):
+    token = jwt(sub='student')
+    checks.verdicts[token] = False
+    assert verify(client, token) is False
+    assert verify(client, token) is False
+    assert len(checks.tokens) == 1
+
+    clock.now += app.ADMIN_TOKEN_NEGATIVE_TTL + 1
+    assert verify(client, token) is False
+    assert len(checks.tokens) == 2
+
+
+def test_revoke_forces_reverification_of_that_token_only(client, checks):
+    revoked, kept = jwt(sub='a'), jwt(sub='b')
+    verify(client, revoked)
+    verify(client, kept)
+
+    response = client.post('/admin/revoke', headers={'Authorization': f'Bearer {revoked}'})
+    assert response.status_code == 200
+    verify(client, revoked)
+    verify(client, kept)
+    assert checks.tokens == [revoked, kept, revoked]
+
+
+def test_expired_token_is_not_served_from_cache(client, checks, clock):
+    token = jwt(sub='admin', exp=time.time() + 2)
+    verify(client, token)
+    verify(client, token)
+    assert len(checks.tokens) == 1
+
+    clock.now += 3
+    verify(client, token)
+    assert len(checks.tokens) == 2
+
+
+def test_already_expired_token_is_never_cached(client, checks):
+    token = jwt(sub='admin', exp=time.time() - 1)
+    verify(client, token)
+    verify(client, token)
+    assert len(checks.tokens) == 2
+
+
+@pytest.mark.parametrize('revoke_same_token', [False, True])
+def test_revoke_during_a_check_drops_only_that_tokens_verdict(app, client, checks, monkeypatch, revoke_same_token):
+    token, other = jwt(sub='a'), jwt(sub='b')
+
+    def check_while_revoking(checked):
+        # Another request revokes a token while this verdict is in flight
+        app.revoke_admin_token(token if revoke_same_token else other)
+        return checks(checked)
+    monkeypatch.setattr(app, 'check_admin_role', check_while_revoking)
+    verify(client, token)
+    monkeypatch.setattr(app, 'check_admin_role', checks)
+    verify(client, token)
+
+    assert len(checks.tokens) == (2 if revoke_same_token else 1)
@@ -0,0 +1,42 @@
+import asyncio
+import json
+
+import pytest
+
+
+@pytest.fixture
+def asgi_app(app):
+    import asgi
+    return asgi.app
+
+
+def call(asgi_app, method, path, payload=None, headers=()):
+    """Send one request through the ASGI app; returns (status, headers, JSON body)"""
+    messages = []
+
+    async def receive():
+        body = json.dumps(payload).encode() if payload is not None else b''
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'scheme': 'http', 'method': method, 'path': path, 'query_string': b'',
+             'headers': [(b'content-type', b'application/json')] + list(headers)}
+    asyncio.run(asgi_app(scope, receive, send))
+    start, body = messages[0], b''.join(message.get('body', b'') for message in messages[1:])
+    headers = {name.decode(): value.decode() for name, value in start['headers']}
+    return start['status'], headers, json.loads(body) if body else None
+
+
+def test_chat_while_model_loads_gets_help_text_as_on_flask(app, asgi_app, client, monkeypatch):
+    monkeypatch.setattr(app.chat_model, 'state', 'loading')
+    utterance = {'text': 'tell me a joke'}
+
+    status, headers, body = call(asgi_app, 'POST', '/process-voice', utterance)
+    flask_response = client.post('/process-voice', json=utterance)
+
+    assert status == flask_response.status_code == 200
+    assert body == flask_response.get_json()
+    assert body['reply'].startswith('Hi! I can help you with your schedule!')
+    assert 'x-session-id' in headers
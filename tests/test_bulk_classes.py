@@ -0,0 +1,85 @@
+import pytest
+
+from conftest import ADMIN_HEADERS
+
+
+def new_class(period, start_time='9:00', end_time='9:50', room=None, **fields):
+    return dict({'day': 'SAT', 'period': period, 'subject': f'ELECTIVE {period}', 'start_time': start_time,
+                 'end_time': end_time, 'room': room or f'R{period}'}, **fields)
+
+
+def post(client, payload):
+    response = client.post('/admin/classes/bulk', headers=ADMIN_HEADERS, json=payload)
+    return response.status_code, response.get_json()
+
+
+def statuses(body):
+    return [(result['index'], result['status']) for result in body['results']]
+
+
+@pytest.mark.parametrize('payload', [[], {'classes': []}, {'classes': 'MON'}])
+def test_empty_or_malformed_batch_is_rejected(client, payload):
+    assert post(client, payload) == (400, {'error': 'Expected a non-empty list of classes'})
+
+
+def test_all_rows_created(app, client):
+    status, body = post(client, {'classes': [new_class(1), new_class(2), new_class(3)]})
+
+    assert status == 201
+    assert (body['created'], body['failed'], body['message']) == (3, 0, '3 of 3 classes added')
+    assert statuses(body) == [(0, 'created'), (1, 'created'), (2, 'created')]
+    assert len({result['class']['id'] for result in body['results']}) == 3
+    assert len(app.storage.select('schedules', where={'day': 'SAT'})) == 3
+
+
+def test_partial_batch_creates_the_valid_rows_and_reports_the_rest(client):
+    status, body = post(client, [
+        new_class(1),
+        {'day': 'SAT', 'period': 2},
+        new_class('x'),
+        new_class(4, '10:40', '9:50'),
+        new_class(1, room='R9'),
+        new_class(6, '9:10', '9:40', room='R1'),
+        new_class(2, day='MON'),
+    ])
+
+    assert status == 201
+    assert (body['created'], body['failed']) == (1, 6)
+    assert statuses(body) == [(0, 'created'), (1, 'invalid'), (2, 'invalid'), (3, 'invalid'),
+                              (4, 'conflict'), (5, 'conflict'), (6, 'conflict')]
+    errors = [result['error'] for result in body['results'][1:]]
+    assert errors == [
+        'Missing required fields',
+        'Period must be a number',
+        'Ends at 9:50 before it starts at 10:40',
+        'Same time slot as row 0',
+        'Room or instructor is already booked at this time',
+        'A class already exists in this time slot',
+    ]
+    assert body['results'][5]['conflicts'][0]['with'] == {
+        'source': 'batch', 'id': 0, 'label': 'ELECTIVE 1', 'day': 'SAT', 'start_time': '9:00',
+        'end_time': '9:50', 'room': 'R1', 'instructor': None}
+
+
+def test_batch_with_no_valid_row_gets_400(app, client):
+    status, body = post(client, [new_class('x'), new_class(2, '9:50', '9:00'), new_class(2, day='MON')])
+
+    assert status == 400
+    assert (body['created'], body['failed']) == (0, 3)
+    assert statuses(body) == [(0, 'invalid'), (1, 'invalid'), (2, 'conflict')]
+    assert app.storage.select('schedules', where={'day': 'SAT'}) == []
+
+
+def test_batch_of_valid_rows_that_all_clash_gets_409(client):
+    status, body = post(client, [new_class(2, day='MON'), new_class(10, '1:30', '2:00', day='MON', room='N106')])
+
+    assert status == 409
+    assert (body['created'], body['failed'], body['message']) == (0, 2, '0 of 2 classes added')
+    assert statuses(body) == [(0, 'conflict'), (1, 'conflict')]
+    assert body['results'][1]['conflicts'][0]['with']['label'] == 'CLOUD'
+
+
+def test_period_sent_as_text_still_hits_the_slot_check(client):
+    status, body = post(client, [new_class('2', day='MON')])
+    assert status == 409
+    assert body['results'][0]['error'] == 'A class already exists in this time slot'
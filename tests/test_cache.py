@@ -0,0 +1,51 @@
+from cache import TTLCache
+
+
+def test_entries_expire_after_their_ttl(clock):
+    entries = TTLCache(ttl=10)
+    entries.set('a', 1)
+    entries.set('b', 2, ttl=30)
+    clock.now += 11
+    assert entries.get('a') is None
+    assert entries.get('b') == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    entries = TTLCache(maxsize=2)
+    entries.set('a', 1)
+    entries.set('b', 2)
+    entries.get('a')
+    entries.set('c', 3)
+    assert (entries.get('a'), entries.get('b'), entries.get('c')) == (1, None, 3)
+
+
+def test_full_invalidation_drops_fills_started_before_it():
+    entries = TTLCache()
+    generation = entries.generation
+    entries.invalidate()
+    entries.set('a', 1, generation=generation)
+    assert entries.get('a') is None
+    entries.set('a', 1, generation=entries.generation)
+    assert entries.get('a') == 1
+
+
+def test_key_invalidation_drops_only_that_keys_fill():
+    entries = TTLCache()
+    generation = entries.generation
+    entries.invalidate('a')
+    entries.set('a', 1, generation=generation)
+    entries.set('b', 2, generation=generation)
+    assert entries.get('a') is None
+    assert entries.get('b') == 2
+
+
+def test_forgotten_key_invalidations_still_drop_older_fills():
+    entries = TTLCache(maxsize=2)
+    generation = entries.generation
+    for key in 'abc':
+        entries.invalidate(key)
+    # 'a' no longer has its own record, so every fill older than it is dropped
+    entries.set('a', 1, generation=generation)
+    entries.set('z', 1, generation=generation)
+    assert entries.get('a') is None
+    assert entries.get('z') is None
@@ -0,0 +1,104 @@
+import pytest
+
+from conflicts import ConflictIndex, IntervalList, slot_from_row
+from conftest import ADMIN_HEADERS
+
+
+def slot(start_time, end_time, room='N106', instructor=None, day='MON', id=1, source='schedules'):
+    return slot_from_row({'id': id, 'day': day, 'start_time': start_time, 'end_time': end_time,
+                          'room': room, 'instructor': instructor, 'subject': f'CLASS {id}'}, source)
+
+
+def intervals(*spans):
+    return IntervalList([{'start': start, 'end': end, 'id': i} for i, (start, end) in enumerate(spans)])
+
+
+@pytest.mark.parametrize('probe', [(490, 540), (590, 640)])
+def test_touching_intervals_do_not_overlap(probe):
+    assert intervals((540, 590)).overlapping(*probe) == []
+
+
+@pytest.mark.parametrize('probe', [(550, 580), (500, 650), (560, 600), (580, 620)])
+def test_nested_and_partial_intervals_overlap(probe):
+    assert [hit['id'] for hit in intervals((540, 590), (700, 750)).overlapping(*probe)] == [0]
+
+
+def test_overlap_is_found_behind_a_long_interval():
+    # The short interval starts later but ends first; the long one still covers the probe
+    hits = intervals((540, 800), (600, 650)).overlapping(700, 720)
+    assert [hit['id'] for hit in hits] == [0]
+
+
+def test_overlapping_pairs():
+    pairs = intervals((540, 590), (590, 640), (600, 610)).overlapping_pairs()
+    assert [(first['id'], second['id']) for first, second in pairs] == [(1, 2)]
+
+
+def test_touching_classes_in_one_room_do_not_conflict():
+    index = ConflictIndex([slot('9:00', '9:50')])
+    assert index.check(slot('9:50', '10:40', id=2)) == []
+
+
+def test_nested_class_conflicts_on_room_and_instructor():
+    index = ConflictIndex([slot('9:00', '10:40', room='n106 ', instructor='Dr Rao')])
+    conflicts = index.check(slot('9:50', '10:20', instructor='dr rao', id=2))
+    assert [(conflict['type'], conflict['with']['id']) for conflict in conflicts] == [('room', 1), ('instructor', 1)]
+
+
+def test_other_days_and_rooms_do_not_conflict():
+    index = ConflictIndex([slot('9:00', '9:50')])
+    assert index.check(slot('9:00', '9:50', day='TUE', id=2)) == []
+    assert index.check(slot('9:00', '9:50', room='N302', id=2)) == []
+
+
+def test_replaced_row_does_not_conflict_with_itself():
+    index = ConflictIndex([slot('9:00', '9:50', id=7)])
+    assert index.check(slot('9:10', '10:00', id=7), exclude=('schedules', 7)) == []
+    assert index.check(slot('9:10', '10:00', id=7), exclude=('course_schedules', 7)) != []
+
+
+def new_class(period, start_time, end_time, **fields):
+    return dict({'day': 'MON', 'period': period, 'subject': 'ELECTIVE', 'start_time': start_time,
+                 'end_time': end_time, 'room': 'N106'}, **fields)
+
+
+def fixture_class(app, period):
+    return app.storage.select('schedules', where={'day': 'MON', 'period': period})[0]
+
+
+def test_add_class_inside_a_booked_slot_gets_409(client):
+    response = client.post('/admin/classes', headers=ADMIN_HEADERS, json=new_class(10, '1:30', '2:00'))
+    assert response.status_code == 409
+    body = response.get_json()
+    assert body['error'] == 'Room or instructor is already booked at this time'
+    assert [(conflict['type'], conflict['with']['label']) for conflict in body['conflicts']] == [('room', 'CLOUD')]
+
+
+def test_add_class_touching_a_booked_slot_is_created(client):
+    response = client.post('/admin/classes', headers=ADMIN_HEADERS, json=new_class(10, '4:50', '5:40'))
+    assert response.status_code == 201
+
+
+def test_update_does_not_conflict_with_the_row_being_updated(app, client):
+    row = fixture_class(app, 6)
+    changes = {field: row[field] for field in app.CLASS_FIELDS}
+    response = client.put(f"/admin/classes/{row['id']}", headers=ADMIN_HEADERS,
+                          json=dict(changes, subject='CLOUD LAB', end_time='2:05'))
+    assert response.status_code == 200
+    assert response.get_json()['class']['subject'] == 'CLOUD LAB'
+
+
+def test_update_into_another_booked_slot_gets_409(app, client):
+    row = fixture_class(app, 6)
+    changes = {field: row[field] for field in app.CLASS_FIELDS}
+    response = client.put(f"/admin/classes/{row['id']}", headers=ADMIN_HEADERS,
+                          json=dict(changes, start_time='2:00', end_time='2:30'))
+    assert response.status_code == 409
+
+
+def test_deleted_class_no_longer_blocks_its_slot(app, client):
+    blocked = new_class(10, '4:10', '4:40')
+    assert client.post('/admin/classes', headers=ADMIN_HEADERS, json=blocked).status_code == 409
+
+    assert client.delete(f"/admin/classes/{fixture_class(app, 9)['id']}", headers=ADMIN_HEADERS).status_code == 200
+    assert client.post('/admin/classes', headers=ADMIN_HEADERS, json=blocked).status_code == 201
@@ -0,0 +1,17 @@
+import json
+import os
+
+import pytest
+
+from intent_router import parse_intent
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'intent_corpus.json')
+
+with open(CORPUS) as f:
+    CASES = json.load(f)
+
+
+@pytest.mark.parametrize('case', CASES, ids=[case['text'] for case in CASES])
+def test_corpus_utterance_parses_as_recorded(case):
+    expected = (case['intent'], case['day'], case['ordinal'], case['subject'])
+    assert tuple(parse_intent(case['text'])) == expected
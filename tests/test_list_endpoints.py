@@ -0,0 +1,85 @@
+import pytest
+
+from conftest import ADMIN_HEADERS
+
+
+def walk(client, url, headers=None):
+    """Every row of a paged list, following next_cursor; returns (rows, pages)"""
+    rows, pages = [], 0
+    while url:
+        body = client.get(url, headers=headers).get_json()
+        pages += 1
+        rows += body['classes']
+        url = f"/admin/classes?limit=7&after={body['next_cursor']}" if body['next_cursor'] else None
+    return rows, pages
+
+
+def test_list_answers_304_until_the_table_is_written(client):
+    first = client.get('/api/courses')
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+
+    repeat = client.get('/api/courses', headers={'If-None-Match': etag})
+    assert repeat.status_code == 304
+    assert repeat.headers['ETag'] == etag
+    assert repeat.data == b''
+
+    client.post('/api/courses', json={'code': 'CS700', 'name': 'Compilers', 'semester': 'S6'})
+    after_write = client.get('/api/courses', headers={'If-None-Match': etag})
+    assert after_write.status_code == 200
+    assert after_write.headers['ETag'] != etag
+    assert 'CS700' in [course['code'] for course in after_write.get_json()]
+
+
+def test_etag_differs_per_query(client):
+    assert client.get('/api/courses?limit=2').headers['ETag'] != client.get('/api/courses').headers['ETag']
+
+
+def test_writes_to_one_table_keep_other_tables_etags(client):
+    etag = client.get('/api/courses').headers['ETag']
+    client.post('/admin/classes', headers=ADMIN_HEADERS, json={
+        'day': 'SAT', 'period': 1, 'subject': 'ELECTIVE', 'start_time': '9:00', 'end_time': '9:50', 'room': 'N106'})
+    assert client.get('/api/courses', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_keyset_cursor_walks_every_row_once_in_key_order(app, client):
+    rows, pages = walk(client, '/admin/classes?limit=7', ADMIN_HEADERS)
+    expected = sorted(app.storage.select('schedules'), key=lambda row: (row['day'], row['period']))
+
+    assert rows == expected
+    assert pages == -(-len(expected) // 7)
+
+
+def test_bare_list_pages_carry_cursor_and_limit_headers(client):
+    response = client.get('/api/courses?limit=2')
+    assert len(response.get_json()) == 2
+    assert response.headers['X-Page-Limit'] == '2'
+    cursor = response.headers['X-Next-Cursor']
+    assert f'after={cursor}' in response.headers['Link']
+
+    rest = client.get(f'/api/courses?limit=100&after={cursor}')
+    assert [course['code'] for course in rest.get_json()][0] > response.get_json()[-1]['code']
+    assert 'X-Next-Cursor' not in rest.headers
+
+
+def test_page_limit_is_reported_when_defaulted_or_capped(app, client):
+    assert client.get('/api/courses').headers['X-Page-Limit'] == str(app.LIST_PAGE_SIZE)
+    assert client.get('/api/courses?limit=100000').headers['X-Page-Limit'] == str(app.LIST_MAX_PAGE_SIZE)
+
+
+def test_fields_projects_columns(client):
+    body = client.get('/admin/classes?fields=subject,day&limit=3', headers=ADMIN_HEADERS).get_json()
+    assert [set(row) for row in body['classes']] == [{'subject', 'day'}] * 3
+    assert body['next_cursor']
+
+
+@pytest.mark.parametrize('query, error', [
+    ('fields=subject,nope', 'Unknown fields: nope'),
+    ('limit=0', 'limit must be at least 1'),
+    ('limit=ten', 'limit must be a number'),
+    ('after=not-a-cursor', 'Invalid cursor'),
+])
+def test_bad_page_arguments_are_rejected(client, query, error):
+    response = client.get(f'/admin/classes?{query}', headers=ADMIN_HEADERS)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
@@ -0,0 +1,82 @@
+import pytest
+
+import database
+from database import TIMETABLE_ENTRIES
+from schedule_index import WeekIndex, class_span, parse_clock, row_span, timetable_problems
+
+FIELDS = ('day', 'period', 'start_time', 'end_time', 'subject', 'room')
+
+
+@pytest.mark.parametrize('time_str, minutes', [
+    ('9:50', 590),
+    ('12:30', 750),
+    ('1:20', 800),
+    ('1:20 PM', 800),
+    ('9:50 am', 590),
+    ('12:15 AM', 15),
+    ('13:20', 800),
+    ('09:50:00', 590),
+    ('06:00', 360),
+    ('01:20', 80),
+])
+def test_parse_clock(time_str, minutes):
+    assert parse_clock(time_str) == minutes
+
+
+@pytest.mark.parametrize('time_str', ['', None, 'noon', '25:00', '9:60', '13:00 PM', '0:30 AM'])
+def test_parse_clock_rejects(time_str):
+    with pytest.raises(ValueError):
+        parse_clock(time_str)
+
+
+@pytest.mark.parametrize('start, end, span', [
+    ('12:30', '1:20', (750, 800)),
+    ('4:00', '4:50', (960, 1010)),
+    ('06:00', '07:00', (360, 420)),
+    ('6:30', '7:30', (390, 450)),
+    ('6:00 PM', '7:00 PM', (1080, 1140)),
+])
+def test_class_span(start, end, span):
+    assert class_span(start, end) == span
+    assert row_span({'start_time': start, 'end_time': end}) == span
+
+
+@pytest.mark.parametrize('start, end', [('10:40', '9:50'), ('9:50', '9:50'), ('9:50', 'later')])
+def test_class_span_rejects(start, end):
+    with pytest.raises(ValueError):
+        class_span(start, end)
+
+
+def test_timetable_fixture_has_no_problems():
+    assert timetable_problems(TIMETABLE_ENTRIES) == []
+
+
+def test_timetable_problems_reports_bad_entries():
+    entries = list(TIMETABLE_ENTRIES) + [
+        ('SAT', 1, '9:00', 'ten', 'ELECTIVE', 'N106'),
+        ('MON', 4, '11:30', '12:20', 'ELECTIVE', 'N106'),
+    ]
+    problems = timetable_problems(entries)
+    assert len(problems) == 2
+    assert problems[0].startswith('SAT period 1: ')
+    assert problems[1] == 'MON period 4 starts before MON period 3 ends'
+
+
+def test_insert_timetable_data_refuses_bad_fixture(monkeypatch):
+    monkeypatch.setattr(database, 'TIMETABLE_ENTRIES', [('MON', 1, '10:40', '9:50', 'ELECTIVE', 'N106')])
+    monkeypatch.setattr(database, 'get_db_connection', lambda: pytest.fail('connected before validating'))
+    with pytest.raises(ValueError, match='MON period 1'):
+        database.insert_timetable_data()
+
+
+def test_week_index_orders_afternoon_after_lunch():
+    index = WeekIndex([dict(zip(FIELDS, entry), id=i) for i, entry in enumerate(TIMETABLE_ENTRIES)])
+
+    assert [row['period'] for row in index.classes_on('MON')] == [2, 3, 5, 6, 7, 9]
+    assert index.current('MON', parse_clock('12:45'))['subject'] == 'LUNCH'
+    assert index.current('MON', parse_clock('1:30'))['period'] == 6
+    assert index.next_class('MON', parse_clock('12:45'))[1]['period'] == 6
+    assert index.next_class('MON', parse_clock('5:00'))[0] == 'TUE'
+    assert index.after_period('MON', 5)['period'] == 6
+    assert index.after_period('MON', 4) is None
+    assert index.after_period('MON', 9) is None
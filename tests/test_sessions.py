@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+import sessions
+from sessions import SessionStore, new_session_id, valid_session_id
+
+
+class WallClock:
+    """Stands in for the time module in sessions, with a clock the test moves"""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def wall_clock(monkeypatch):
+    clock = WallClock()
+    monkeypatch.setattr(sessions, 'time', clock)
+    return clock
+
+
+def remember(context, subject):
+    context.last_class = {'subject': subject, 'period': 2, 'day': 'MON'}
+    context.last_query_type = 'nth_class'
+    context.last_day = 'MON'
+    context.greeting_done = True
+
+
+def test_session_ids():
+    assert valid_session_id(new_session_id())
+    assert not valid_session_id('short')
+    assert not valid_session_id('x' * 16 + ';')
+    assert not valid_session_id(None)
+
+
+def test_same_session_gets_the_same_context():
+    store = SessionStore(maxsize=10)
+    assert store.load('a' * 16) is store.load('a' * 16)
+    assert store.load('a' * 16) is not store.load('b' * 16)
+    assert store.stats()['misses'] == 2
+
+
+def test_least_recently_used_session_is_evicted_at_capacity():
+    store = SessionStore(maxsize=2)
+    first = store.load('first-session-id')
+    remember(first, 'CLOUD')
+    store.load('second-session-id')
+    store.load('first-session-id')
+    store.load('third-session-id')
+
+    assert len(store) == 2
+    assert store.load('first-session-id').last_class == {'subject': 'CLOUD', 'period': 2, 'day': 'MON'}
+    # second was least recently used, so it made way for third
+    misses = store.stats()['misses']
+    store.load('second-session-id')
+    assert store.stats()['misses'] == misses + 1
+
+
+def test_evicted_context_is_dropped_without_a_spill_file():
+    store = SessionStore(maxsize=1)
+    remember(store.load('first-session-id'), 'CLOUD')
+    store.load('second-session-id')
+
+    assert store.load('first-session-id').last_class is None
+    assert store.stats()['spills'] == 0
+
+
+def test_spilled_context_reloads_with_its_follow_up_state(tmp_path):
+    store = SessionStore(maxsize=1, spill_path=str(tmp_path / 'sessions.db'))
+    remember(store.load('first-session-id'), 'CLOUD')
+    store.load('second-session-id')
+    assert store.stats()['spilled'] == 1
+
+    restored = store.load('first-session-id')
+
+    assert restored.to_dict() == {
+        'last_class': {'subject': 'CLOUD', 'period': 2, 'day': 'MON'},
+        'last_query_type': 'nth_class',
+        'last_day': 'MON',
+        'greeting_done': True
+    }
+    stats = store.stats()
+    assert (stats['spills'], stats['restores'], stats['size']) == (2, 1, 1)
+    # second was spilled to make room, and first's spilled copy was taken back
+    assert stats['spilled'] == 1
+
+
+def test_idle_sessions_expire_in_memory_and_in_the_spill(tmp_path, wall_clock):
+    store = SessionStore(maxsize=1, idle_ttl=60, spill_path=str(tmp_path / 'sessions.db'))
+    remember(store.load('first-session-id'), 'CLOUD')
+    remember(store.load('second-session-id'), 'CLOUD')
+
+    wall_clock.now += 61
+    assert store.load('first-session-id').last_class is None
+    assert store.load('second-session-id').last_class is None
+    assert store.stats()['expirations'] == 1
+
+
+def test_concurrent_get_context_for_one_session_shares_a_context(app, monkeypatch):
+    monkeypatch.setattr(app, 'sessions', SessionStore(maxsize=100))
+    session_id = new_session_id()
+    barrier = threading.Barrier(8)
+    contexts = []
+
+    def load():
+        with app.app.test_request_context(headers={app.SESSION_HEADER: session_id}):
+            barrier.wait()
+            contexts.append(app.get_context())
+    threads = [threading.Thread(target=load) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(contexts) == 8
+    assert all(context is contexts[0] for context in contexts)
+    assert len(app.sessions) == 1
+    assert app.sessions.stats()['misses'] == 1
+
+
+def test_follow_up_survives_a_spill_between_turns(app, client, monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'sessions', SessionStore(maxsize=1, spill_path=str(tmp_path / 'sessions.db')))
+
+    def say(text, student=client):
+        # Each test client keeps its own session cookie
+        response = student.post('/process-voice', json={'text': text})
+        return response.get_json()['reply']
+
+    assert 'SOFT SKILLS' in say('what is my first class on monday')
+    # Another student's turn pushes this session out to the spill file
+    say('what is my first class on tuesday', app.app.test_client())
+    assert app.sessions.stats()['spills'] == 1
+
+    reply = say("what's after that")
+    assert reply.startswith('After SOFT SKILLS, you have DISTRIBUTED SYSTEMS')
+    assert app.sessions.stats()['restores'] == 1